@@ -0,0 +1,72 @@
+"""Recall vs latency of the gallery indexes on synthetic galleries
+
+Usage: python -m benchmarks.bench_ann --sizes 10000 100000 --n-probe 1 4 16
+"""
+import argparse
+import time
+import numpy as np
+from core.gallery import FaceGallery
+from core.gallery_index import create_index
+from benchmarks.synthetic import synthetic_gallery, synthetic_queries
+
+
+def time_search(gallery, queries, k, batch_size):
+    """Return (indices, mean latency per query in ms)"""
+    results = []
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        results.append(gallery.search(queries[offset:offset + batch_size], k)[0])
+    elapsed = time.perf_counter() - start
+    return np.concatenate(results), elapsed * 1000.0 / len(queries)
+
+
+def recall_at_k(found, exact):
+    """Fraction of exact k nearest rows present in found"""
+    hits = sum(len(np.intersect1d(f, e)) for f, e in zip(found, exact))
+    return hits / exact.size
+
+
+def run(sizes, n_probes, n_lists=None, queries=200, k=1, batch_size=4):
+    """Run the benchmark and return a list of result rows"""
+    rows = []
+    for size in sizes:
+        matrix = synthetic_gallery(size)
+        query_matrix, _ = synthetic_queries(matrix, queries)
+
+        brute = FaceGallery(matrix, index=create_index('brute'))
+        exact, brute_ms = time_search(brute, query_matrix, k, batch_size)
+        rows.append({'size': size, 'index': 'brute', 'n_probe': None,
+                     'build_s': 0.0, 'recall': 1.0, 'latency_ms': brute_ms})
+
+        for n_probe in n_probes:
+            start = time.perf_counter()
+            ivf = FaceGallery(matrix, index=create_index('ivf', n_lists=n_lists,
+                                                         n_probe=n_probe, min_rows=0))
+            build_s = time.perf_counter() - start
+            found, ivf_ms = time_search(ivf, query_matrix, k, batch_size)
+            rows.append({'size': size, 'index': 'ivf', 'n_probe': n_probe,
+                         'build_s': build_s, 'recall': recall_at_k(found, exact),
+                         'latency_ms': ivf_ms})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000])
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--n-lists', type=int, default=None)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=4,
+                        help='faces matched together, like faces in one frame')
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'index':>6} {'n_probe':>8} {'build s':>8} {'recall':>7} {'ms/query':>9}")
+    for row in run(args.sizes, args.n_probe, args.n_lists, args.queries, args.k, args.batch_size):
+        n_probe = '-' if row['n_probe'] is None else row['n_probe']
+        print(f"{row['size']:>8} {row['index']:>6} {n_probe:>8} {row['build_s']:>8.2f} "
+              f"{row['recall']:>7.3f} {row['latency_ms']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
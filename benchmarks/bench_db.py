@@ -0,0 +1,79 @@
+"""Attendance insert throughput on the embedded SQLite backend
+
+Usage: python -m benchmarks.bench_db [--records 2000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from database.storage import create_queries
+from core.attendance_writer import AttendanceWriter
+
+
+def make_queries(path, users):
+    """Open a fresh SQLite database with users enrolled (attendance references them)"""
+    db_queries = create_queries('sqlite', path)
+    db_queries.upsert_users([(f'U{i:06d}', f'User {i}', 'student', 'CSE', None, None)
+                             for i in range(users)])
+    return db_queries
+
+
+def run(records=2000, batch_size=50):
+    """Return inserts/s for single-row, batched and write-behind inserts"""
+    directory = tempfile.mkdtemp(prefix='face-bench-db-')
+    results = {'records': records}
+    opened = []
+    try:
+        db_queries = make_queries(os.path.join(directory, 'single.db'), records)
+        opened.append(db_queries.db_config)
+        start = time.perf_counter()
+        for i in range(records):
+            db_queries.mark_attendance(f'U{i:06d}', f'User {i}', 'student', 'CSE')
+        results['single_rows_per_s'] = records / (time.perf_counter() - start)
+
+        db_queries = make_queries(os.path.join(directory, 'batch.db'), records)
+        opened.append(db_queries.db_config)
+        now = datetime.now()
+        batch = [{'user_id': f'U{i:06d}', 'name': f'User {i}', 'role': 'student',
+                  'branch': 'CSE', 'designation': None, 'timestamp': now}
+                 for i in range(records)]
+        start = time.perf_counter()
+        for offset in range(0, records, batch_size):
+            db_queries.mark_attendance_batch(batch[offset:offset + batch_size])
+        results['batch_rows_per_s'] = records / (time.perf_counter() - start)
+
+        db_queries = make_queries(os.path.join(directory, 'writer.db'), records)
+        opened.append(db_queries.db_config)
+        writer = AttendanceWriter(db_queries, batch_size=batch_size, flush_interval=0.05)
+        start = time.perf_counter()
+        for i in range(records):
+            writer.submit(f'U{i:06d}', f'User {i}', 'student', 'CSE')
+        submitted = time.perf_counter() - start
+        writer.flush()
+        results['write_behind_rows_per_s'] = records / (time.perf_counter() - start)
+        results['write_behind_submit_us'] = submitted * 1e6 / records
+        writer.close()
+    finally:
+        for db_config in opened:
+            db_config.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    results = run(args.records, args.batch_size)
+    print(f"single-row inserts:   {results['single_rows_per_s']:10.0f} rows/s")
+    print(f"batched inserts:      {results['batch_rows_per_s']:10.0f} rows/s")
+    print(f"write-behind queue:   {results['write_behind_rows_per_s']:10.0f} rows/s "
+          f"({results['write_behind_submit_us']:.1f} us per submit)")
+
+
+if __name__ == '__main__':
+    main()
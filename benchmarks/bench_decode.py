@@ -0,0 +1,48 @@
+"""Decode throughput of legacy pickled vs raw face encodings
+
+Usage: python -m benchmarks.bench_decode [--count 100000]
+"""
+import argparse
+import pickle
+import time
+import numpy as np
+from utils.encoder import bytes_to_encode, encode_to_bytes
+from benchmarks.synthetic import synthetic_gallery
+
+
+def encode_blobs(gallery, fmt):
+    """Return the database BLOBs for gallery in the given format"""
+    if fmt == 'pickle':
+        return [pickle.dumps(row.astype(np.float64)) for row in gallery]
+    return [encode_to_bytes(row, fmt) for row in gallery]
+
+
+def run(count, formats=('pickle', 'float64', 'float32', 'float16')):
+    """Return one result row per storage format"""
+    gallery = synthetic_gallery(count)
+    rows = []
+    for fmt in formats:
+        blobs = encode_blobs(gallery, fmt)
+        start = time.perf_counter()
+        for blob in blobs:
+            bytes_to_encode(blob)
+        elapsed = time.perf_counter() - start
+        rows.append({'format': fmt, 'bytes': len(blobs[0]),
+                     'decodes_per_s': count / elapsed,
+                     'us_per_decode': elapsed * 1e6 / count})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'format':>8} {'bytes':>6} {'decodes/s':>12} {'us/decode':>10}")
+    for row in run(args.count):
+        print(f"{row['format']:>8} {row['bytes']:>6} {row['decodes_per_s']:>12.0f} "
+              f"{row['us_per_decode']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Gallery load time: direct database load vs embedding cache
+
+Usage: python -m benchmarks.bench_load [--sizes 1000 10000 100000]
+"""
+import argparse
+import pickle
+import shutil
+import tempfile
+import time
+import numpy as np
+from core.face_recognition import FaceRecognizer
+from benchmarks.synthetic import synthetic_gallery, synthetic_users, SyntheticUserQueries
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def run(sizes=(1000, 10000, 100000)):
+    """Return load times in milliseconds per gallery size and load path"""
+    rows = []
+    for size in sizes:
+        matrix = synthetic_gallery(size)
+        pickled = SyntheticUserQueries(synthetic_users(
+            matrix, lambda vector: pickle.dumps(vector.astype(np.float64))))
+        raw = SyntheticUserQueries(synthetic_users(matrix))
+
+        row = {'size': size}
+        row['direct_pickle_ms'] = timed(
+            lambda: FaceRecognizer(cache_dir=None, db_queries=pickled))
+        row['direct_raw_ms'] = timed(lambda: FaceRecognizer(cache_dir=None, db_queries=raw))
+
+        cache_dir = tempfile.mkdtemp(prefix='face-cache-')
+        try:
+            row['cache_cold_ms'] = timed(lambda: FaceRecognizer(cache_dir=cache_dir, db_queries=raw))
+            # Nothing changed since the snapshot: only the watermark query runs
+            unchanged = SyntheticUserQueries([])
+            unchanged.get_enrolled_user_ids = raw.get_enrolled_user_ids
+            row['cache_warm_ms'] = timed(
+                lambda: FaceRecognizer(cache_dir=cache_dir, db_queries=unchanged))
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'pickle ms':>10} {'raw ms':>10} {'cold ms':>10} {'warm ms':>10}")
+    for row in run(args.sizes):
+        print(f"{row['size']:>8} {row['direct_pickle_ms']:>10.1f} {row['direct_raw_ms']:>10.1f} "
+              f"{row['cache_cold_ms']:>10.1f} {row['cache_warm_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
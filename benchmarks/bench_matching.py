@@ -0,0 +1,53 @@
+"""Matching cost vs gallery size and templates per user
+
+Usage: python -m benchmarks.bench_matching [--sizes 1000 10000 200000] [--templates 1 5]
+"""
+import argparse
+from core.gallery import FaceGallery
+from core.gallery_index import create_index
+from benchmarks.harness import measure
+from benchmarks.synthetic import synthetic_gallery, synthetic_queries, synthetic_templates
+
+DEFAULT_SIZES = [1000, 10000, 50000, 100000, 200000]
+
+
+def run(sizes=DEFAULT_SIZES, faces_per_frame=(1, 4), k=3, repeat=20, templates=(1,)):
+    """Return one result row per gallery size, templates per user, index, faces and reduction.
+
+    size counts users; a gallery with several templates per user holds
+    size * templates rows and is searched per identity.
+    """
+    rows = []
+    for size in sizes:
+        users = synthetic_gallery(size)
+        for per_user in templates:
+            matrix, labels = synthetic_templates(users, per_user) if per_user > 1 else (users, None)
+            for index_name, options in (('brute', {}), ('ivf', {'n_probe': 8})):
+                gallery = FaceGallery(matrix, index=create_index(index_name, **options),
+                                      labels=labels)
+                for faces in faces_per_frame:
+                    queries, _ = synthetic_queries(users, faces)
+                    for reduce in (('min',) if per_user == 1 else ('min', 'mean')):
+                        stats = measure(lambda: gallery.search_identities(queries, k, reduce),
+                                        repeat=repeat)
+                        rows.append(dict(stats, size=size, templates=per_user, index=index_name,
+                                         faces=faces, reduce=reduce))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--templates', type=int, nargs='+', default=[1],
+                        help='templates per user to compare')
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'tmpl':>5} {'index':>6} {'faces':>6} {'reduce':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")
+    for row in run(args.sizes, templates=args.templates):
+        print(f"{row['size']:>8} {row['templates']:>5} {row['index']:>6} {row['faces']:>6} "
+              f"{row['reduce']:>7} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
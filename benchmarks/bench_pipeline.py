@@ -0,0 +1,108 @@
+"""Per-stage latency of FaceRecognizer on synthetic and recorded frames
+
+Usage: python -m benchmarks.bench_pipeline [--frames video.mp4|image_dir] [--gallery-size 5000]
+
+Synthetic frames contain no faces, so detection time is measured on them
+as is and encoding/matching use a fixed face-sized box. Recorded frames
+exercise the real detect, encode and match path.
+"""
+import argparse
+import os
+import numpy as np
+import cv2
+from core.face_recognition import FaceRecognizer
+from benchmarks.harness import measure
+from benchmarks.synthetic import synthetic_gallery, synthetic_users, SyntheticUserQueries
+
+
+def load_frames(path, limit=50):
+    """Read up to limit BGR frames from a video file or image directory"""
+    frames = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path))[:limit]:
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                frames.append(frame)
+        return frames
+    capture = cv2.VideoCapture(path)
+    while len(frames) < limit:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def synthetic_frames(count=10, width=640, height=480, seed=0):
+    """Return noise frames at camera resolution"""
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def make_recognizer(gallery_size):
+    """Build a recognizer over a synthetic gallery without touching MySQL"""
+    matrix = synthetic_gallery(gallery_size)
+    users = synthetic_users(matrix)
+    return FaceRecognizer(cache_dir=None, db_queries=SyntheticUserQueries(users))
+
+
+def stage_latencies(recognizer, frames, repeat=10):
+    """Return latency stats for each recognition stage over frames"""
+    results = {}
+    prepared = [recognizer.prepare_frame(frame) for frame in frames]
+    locations = [recognizer.detect_faces(small) for small in prepared]
+    height, width = frames[0].shape[:2]
+    # Use a face-sized box where detection found nothing
+    default_box = [(height // 4, width * 5 // 8, height * 3 // 4, width * 3 // 8)]
+    locations = [found or default_box for found in locations]
+    encodings = [recognizer.encode_faces(small, found) for small, found in zip(prepared, locations)]
+
+    cycle = {'index': 0}
+
+    def next_index():
+        cycle['index'] = (cycle['index'] + 1) % len(frames)
+        return cycle['index']
+
+    results['prepare'] = measure(lambda: recognizer.prepare_frame(frames[next_index()]), repeat)
+    results['detect'] = measure(lambda: recognizer.detect_faces(prepared[next_index()]), repeat)
+
+    def encode():
+        i = next_index()
+        recognizer.encode_faces(prepared[i], locations[i])
+    results['encode'] = measure(encode, repeat)
+    results['match'] = measure(lambda: recognizer.match_encodings(encodings[next_index()]), repeat)
+    results['total'] = measure(lambda: recognizer.recognize_faces(frames[next_index()]), repeat)
+    return results
+
+
+def run(frames_path=None, gallery_size=5000, repeat=10):
+    """Return stage latencies for synthetic frames and, if given, recorded frames"""
+    recognizer = make_recognizer(gallery_size)
+    results = {'gallery_size': gallery_size,
+               'synthetic': stage_latencies(recognizer, synthetic_frames(), repeat)}
+    if frames_path:
+        frames = load_frames(frames_path)
+        if frames:
+            results['recorded'] = stage_latencies(recognizer, frames, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', help='video file or image directory of recorded frames')
+    parser.add_argument('--gallery-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    results = run(args.frames, args.gallery_size, args.repeat)
+    for source in ('synthetic', 'recorded'):
+        if source not in results:
+            continue
+        print(f"{source} frames, gallery of {results['gallery_size']}:")
+        for stage, stats in results[source].items():
+            print(f"  {stage:>8}: p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
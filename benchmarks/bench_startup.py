@@ -0,0 +1,149 @@
+"""Startup cost: per-module import time and time to the first painted window
+
+Usage: python -m benchmarks.bench_startup [--targets main gui.attendance_window] [--budget-ms 1500]
+
+Every measurement runs in a fresh interpreter, since a module is only
+imported once per process. Import times come from `python -X importtime`.
+The first-window time covers interpreter start, the imports main.py makes,
+QApplication and MainWindow construction and one round of event
+processing, with Qt's offscreen platform so no display is needed; the
+database is not touched.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main is what the menu needs; the camera windows are imported on first use
+TARGETS = ('main', 'gui.attendance_window', 'gui.register_window')
+
+FIRST_WINDOW = """
+import sys
+from PyQt5.QtWidgets import QApplication
+from main import MainWindow
+for module in ('cv2', 'dlib', 'face_recognition'):
+    assert module not in sys.modules, f'{module} was imported before the first window'
+app = QApplication([])
+window = MainWindow()
+window.show()
+app.processEvents()
+"""
+
+
+def _python(args, env=None):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True,
+                          env=dict(os.environ, **(env or {})))
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        # Nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((module, int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def import_breakdown(target, top=10):
+    """Import target in a fresh interpreter; return where its import time goes.
+
+    packages_ms sums the self time of every module by top-level package
+    (numpy, cv2, mysql, ...); slowest lists the target's direct imports
+    by cumulative time.
+    """
+    result = _python(['-X', 'importtime', '-c', f'import {target}'])
+    if result.returncode != 0:
+        return {'target': target, 'error': result.stderr.strip().splitlines()[-1]}
+    entries = parse_importtime(result.stderr)
+    # Entries are printed after their own imports, so the target's subtree
+    # is everything after the interpreter's startup imports
+    end = max(i for i, entry in enumerate(entries) if entry[3] == 0 and entry[0] == target)
+    start = max([i + 1 for i, entry in enumerate(entries[:end]) if entry[3] == 0] or [0])
+    subtree = entries[start:end + 1]
+    packages = {}
+    for module, self_us, _, _ in subtree:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    direct = sorted((entry for entry in subtree if entry[3] == 1), key=lambda entry: -entry[2])
+    return {
+        'target': target,
+        'import_ms': entries[end][2] / 1000.0,
+        'modules': len(subtree),
+        'slowest': [{'module': module, 'cumulative_ms': cumulative_us / 1000.0}
+                    for module, _, cumulative_us, _ in direct[:top]],
+        'packages_ms': {package: us / 1000.0 for package, us in
+                        sorted(packages.items(), key=lambda item: -item[1])[:top]},
+    }
+
+
+def wall_time(args, repeat, env=None):
+    """Median wall time in milliseconds of a fresh interpreter running args"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = _python(args, env)
+        samples.append((time.perf_counter() - start) * 1000.0)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+    return float(np.median(samples)), None
+
+
+def run(targets=TARGETS, repeat=5):
+    """Return import breakdowns per target and the time to the first window"""
+    interpreter_ms, _ = wall_time(['-c', 'pass'], repeat)
+    rows = []
+    for target in targets:
+        row = import_breakdown(target)
+        if 'error' not in row:
+            row['wall_ms'], _ = wall_time(['-c', f'import {target}'], repeat)
+        rows.append(row)
+    first_window = {}
+    first_window['wall_ms'], error = wall_time(['-c', FIRST_WINDOW], repeat,
+                                               env={'QT_QPA_PLATFORM': 'offscreen'})
+    if error:
+        first_window = {'skipped': error}
+    return {'interpreter_ms': interpreter_ms, 'imports': rows, 'first_window': first_window}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float,
+                        help='exit with status 1 if the first window takes longer')
+    args = parser.parse_args()
+
+    result = run(args.targets, args.repeat)
+    print(f"bare interpreter: {result['interpreter_ms']:.0f} ms")
+    for row in result['imports']:
+        if 'error' in row:
+            print(f"\n{row['target']}: failed ({row['error']})")
+            continue
+        print(f"\n{row['target']}: {row['import_ms']:.0f} ms of imports "
+              f"({row['modules']} modules), {row['wall_ms']:.0f} ms wall")
+        for package, ms in row['packages_ms'].items():
+            print(f"  {package:<28} {ms:>8.1f} ms self")
+        for entry in row['slowest']:
+            print(f"  import {entry['module']:<21} {entry['cumulative_ms']:>8.1f} ms total")
+
+    first_window = result['first_window']
+    if 'skipped' in first_window:
+        print(f"\nfirst window: skipped ({first_window['skipped']})")
+        return
+    print(f"\nfirst window: {first_window['wall_ms']:.0f} ms")
+    if args.budget_ms is not None and first_window['wall_ms'] > args.budget_ms:
+        print(f"over the {args.budget_ms:.0f} ms startup budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
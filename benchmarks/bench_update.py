@@ -0,0 +1,73 @@
+"""Cost of one enrollment: incremental gallery update vs full rebuild
+
+Usage: python -m benchmarks.bench_update [--sizes 1000 10000 100000] [--templates 5]
+"""
+import argparse
+import time
+import numpy as np
+from core.gallery import FaceGallery
+from benchmarks.harness import measure
+from benchmarks.synthetic import synthetic_gallery, synthetic_templates
+
+
+def users(count, prefix='U'):
+    return [{'user_id': f'{prefix}{row:06d}', 'name': f'User {row}'} for row in range(count)]
+
+
+def time_operations(gallery, encodings, operations):
+    """Apply operations in sequence to successive snapshots; return per-call microseconds"""
+    samples = []
+    for operation in operations:
+        start = time.perf_counter()
+        gallery = operation(gallery, encodings)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples = np.asarray(samples)
+    return {'p50_us': float(np.percentile(samples, 50)),
+            'p95_us': float(np.percentile(samples, 95)),
+            'mean_us': float(samples.mean())}
+
+
+def run(sizes=(1000, 10000, 100000), templates=5, operations=500, repeat=3):
+    """Return one row per gallery size with rebuild and add/update/remove costs.
+
+    mean_us includes the periodic compactions, so it is the amortized cost.
+    """
+    rows = []
+    for size in sizes:
+        matrix, labels = synthetic_templates(synthetic_gallery(size), templates)
+        gallery_users = users(size)
+        rebuild = measure(lambda: FaceGallery(matrix, labels=labels, users=gallery_users),
+                          repeat=repeat, warmup=1)
+        encodings = matrix[:templates]
+        count = min(operations, size)
+        row = {'size': size, 'templates': templates, 'rebuild_ms': rebuild['p50_ms']}
+        # Snapshots share storage, so every sequence starts from a fresh gallery
+        fresh = lambda: FaceGallery(matrix, labels=labels, users=gallery_users)
+        row['add'] = time_operations(fresh(), encodings, [
+            lambda g, e, user=user: g.add(user, e) for user in users(count, prefix='N')])
+        row['update'] = time_operations(fresh(), encodings, [
+            lambda g, e, user=user: g.update(user, e) for user in gallery_users[:count]])
+        row['remove'] = time_operations(fresh(), encodings, [
+            lambda g, e, user_id=user['user_id']: g.remove(user_id)
+            for user in gallery_users[:count]])
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--templates', type=int, default=5, help='templates per user')
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'rebuild ms':>11} {'add us':>8} {'update us':>10} {'remove us':>10}"
+          f"  (p50; amortized mean in brackets)")
+    for row in run(args.sizes, args.templates):
+        print(f"{row['size']:>8} {row['rebuild_ms']:>11.1f} "
+              f"{row['add']['p50_us']:>8.0f} {row['update']['p50_us']:>10.0f} "
+              f"{row['remove']['p50_us']:>10.0f}  ({row['add']['mean_us']:.0f}/"
+              f"{row['update']['mean_us']:.0f}/{row['remove']['mean_us']:.0f})")
+
+
+if __name__ == '__main__':
+    main()
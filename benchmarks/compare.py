@@ -0,0 +1,77 @@
+"""Compare two benchmark result files
+
+Usage: python -m benchmarks.compare baseline.json candidate.json [--threshold 0.1]
+
+Metrics ending in _ms are better when lower; metrics ending in _per_s
+are better when higher. Changes beyond the threshold are flagged.
+"""
+import argparse
+import json
+
+# Fields that identify a result row rather than measure it
+KEY_FIELDS = ('size', 'templates', 'index', 'faces', 'reduce', 'n_probe', 'format',
+              'gallery_size', 'target', 'module')
+
+
+def flatten(value, prefix=''):
+    """Map dotted metric paths to numbers, keying list rows by their identifying fields"""
+    metrics = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            metrics.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        for position, item in enumerate(value):
+            if isinstance(item, dict):
+                label = ','.join(f"{field}={item[field]}" for field in KEY_FIELDS if field in item)
+            else:
+                label = ''
+            metrics.update(flatten(item, f"{prefix}[{label or position}]"))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        metrics[prefix] = float(value)
+    return metrics
+
+
+def direction(metric):
+    """Return -1 if lower is better, 1 if higher is better, 0 if not a performance metric"""
+    name = metric.rsplit('.', 1)[-1]
+    if name.endswith('_ms') or name.endswith('_us') or name.endswith('_s') and 'per_s' not in name:
+        return -1
+    if name.endswith('_per_s') or name == 'recall':
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+    print(f"baseline:  {baseline['environment'].get('commit')} {baseline['environment']['timestamp']}")
+    print(f"candidate: {candidate['environment'].get('commit')} {candidate['environment']['timestamp']}")
+
+    before = flatten(baseline['results'])
+    after = flatten(candidate['results'])
+    regressions = 0
+    for metric in sorted(before.keys() & after.keys()):
+        sign = direction(metric)
+        if sign == 0 or before[metric] == 0:
+            continue
+        change = (after[metric] - before[metric]) / before[metric]
+        flag = ''
+        if change * sign < -args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif change * sign > args.threshold:
+            flag = '  improved'
+        print(f"{metric:70} {before[metric]:12.3f} {after[metric]:12.3f} {change:+8.1%}{flag}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
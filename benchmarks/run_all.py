@@ -0,0 +1,71 @@
+"""Run the benchmark suite and save the results as JSON
+
+Usage: python -m benchmarks.run_all [--quick] [--frames video.mp4] [--out results.json]
+
+Nothing here needs a camera or a MySQL server. Benchmarks whose optional
+dependencies are missing are recorded as skipped.
+"""
+import argparse
+import importlib
+import json
+import time
+from benchmarks.harness import environment
+
+
+def suite(quick=False, frames=None):
+    """Return (name, module, keyword arguments) for every benchmark"""
+    if quick:
+        return [
+            ('matching', 'benchmarks.bench_matching', {'sizes': [1000, 10000], 'repeat': 5,
+                                                       'templates': [1, 5]}),
+            ('ann', 'benchmarks.bench_ann', {'sizes': [10000], 'n_probes': [4, 16], 'queries': 50}),
+            ('decode', 'benchmarks.bench_decode', {'count': 10000}),
+            ('update', 'benchmarks.bench_update', {'sizes': [1000, 10000], 'operations': 300}),
+            ('load', 'benchmarks.bench_load', {'sizes': [1000, 10000]}),
+            ('startup', 'benchmarks.bench_startup', {'repeat': 2}),
+            ('db', 'benchmarks.bench_db', {'records': 500}),
+            ('pipeline', 'benchmarks.bench_pipeline', {'frames_path': frames, 'gallery_size': 1000,
+                                                       'repeat': 3}),
+        ]
+    return [
+        ('matching', 'benchmarks.bench_matching', {'templates': [1, 5]}),
+        ('ann', 'benchmarks.bench_ann', {'sizes': [10000, 100000], 'n_probes': [1, 4, 8, 16, 32]}),
+        ('decode', 'benchmarks.bench_decode', {'count': 100000}),
+        ('update', 'benchmarks.bench_update', {}),
+        ('load', 'benchmarks.bench_load', {}),
+        ('startup', 'benchmarks.bench_startup', {}),
+        ('db', 'benchmarks.bench_db', {}),
+        ('pipeline', 'benchmarks.bench_pipeline', {'frames_path': frames}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='smaller sizes for a fast check')
+    parser.add_argument('--frames', help='recorded video or image directory for the pipeline')
+    parser.add_argument('--only', nargs='+', help='run only these benchmarks')
+    parser.add_argument('--out', default='bench_results.json')
+    args = parser.parse_args()
+
+    report = {'environment': environment(), 'quick': args.quick, 'results': {}}
+    for name, module_name, options in suite(args.quick, args.frames):
+        if args.only and name not in args.only:
+            continue
+        print(f"Running {name}...", flush=True)
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"  skipped: {e}")
+            report['results'][name] = {'skipped': str(e)}
+            continue
+        report['results'][name] = module.run(**options)
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
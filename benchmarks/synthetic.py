@@ -0,0 +1,71 @@
+"""Synthetic face encodings for benchmarks"""
+import numpy as np
+from core.gallery_index import ENCODING_DIM
+
+
+def synthetic_gallery(size, seed=0, n_clusters=64, spread=0.35):
+    """Return a float32 gallery shaped like real dlib encodings.
+
+    Real encodings are not uniform: they cluster by age, ethnicity and
+    capture conditions, so points are drawn around a few random centres.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0.0, 0.1, size=(n_clusters, ENCODING_DIM))
+    labels = rng.integers(0, n_clusters, size=size)
+    gallery = centres[labels] + rng.normal(0.0, spread / np.sqrt(ENCODING_DIM),
+                                           size=(size, ENCODING_DIM))
+    return gallery.astype(np.float32)
+
+
+def synthetic_queries(gallery, count, seed=1, noise=0.2):
+    """Return (queries, true_rows): noisy copies of random gallery rows"""
+    rng = np.random.default_rng(seed)
+    true_rows = rng.integers(0, gallery.shape[0], size=count)
+    queries = gallery[true_rows] + rng.normal(0.0, noise / np.sqrt(ENCODING_DIM),
+                                              size=(count, ENCODING_DIM))
+    return queries.astype(np.float32), true_rows
+
+
+def synthetic_templates(gallery, per_user, seed=2, noise=0.15):
+    """Return (matrix, labels): per_user noisy captures of every gallery row"""
+    rng = np.random.default_rng(seed)
+    labels = np.repeat(np.arange(gallery.shape[0]), per_user)
+    matrix = gallery[labels] + rng.normal(0.0, noise / np.sqrt(ENCODING_DIM),
+                                          size=(labels.shape[0], ENCODING_DIM))
+    return matrix.astype(np.float32), labels
+
+
+def synthetic_users(gallery, encode=None):
+    """Return users table rows for gallery, with face_encoding encoded by encode"""
+    from utils.encoder import encode_to_bytes
+    encode = encode or encode_to_bytes
+    return [{
+        'user_id': f'U{row:06d}',
+        'name': f'User {row}',
+        'role': 'student' if row % 10 else 'teacher',
+        'branch': 'CSE' if row % 10 else None,
+        'designation': None if row % 10 else 'Lecturer',
+        'face_encoding': encode(vector),
+        'updated_at': '2024-01-01 00:00:00',
+    } for row, vector in enumerate(gallery)]
+
+
+class SyntheticUserQueries:
+    """Stands in for DatabaseQueries when loading the gallery in benchmarks"""
+
+    def __init__(self, users):
+        self.users = users
+
+    def get_all_users(self):
+        return self.users
+
+    def get_users_modified_since(self, watermark=None):
+        if watermark is None:
+            return self.users
+        return [user for user in self.users if str(user['updated_at']) >= watermark]
+
+    def get_enrolled_user_ids(self):
+        return [user['user_id'] for user in self.users]
+
+    def get_face_templates(self, user_ids=None):
+        return []
@@ -1,18 +1,150 @@
 """Attendance tracking module"""
-from datetime import datetime
-from database.db_queries import DatabaseQueries
+import calendar
+from datetime import date as date_type, datetime
+from database.storage import create_queries
+from core.attendance_writer import AttendanceWriter
+from core.cooldown import AttendanceCooldown, session_for
 
 class AttendanceTracker:
-    def __init__(self):
-        self.db_queries = DatabaseQueries()
+    def __init__(self, batch_size=50, flush_interval=1.0, session_minutes=None):
+        self.db_queries = create_queries()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_minutes = session_minutes
+        self.cooldown = AttendanceCooldown(session_minutes)
+        self.writer = None
+    
+    def already_marked(self, user_id):
+        """Check the cooldown cache for a mark in the current session, without a DB round trip"""
+        return self.cooldown.is_marked(user_id)
     
     def mark_attendance(self, user_id, name, role, branch=None, designation=None):
-        """Mark attendance for a recognized user"""
-        return self.db_queries.mark_attendance(user_id, name, role, branch, designation)
+        """Mark attendance for a recognized user.
+        
+        Returns True if attendance is recorded for the current session,
+        including when it already was.
+        """
+        now = datetime.now()
+        if not self.cooldown.try_acquire(user_id, now):
+            return True
+        _, session = session_for(now, self.session_minutes)
+        success = self.db_queries.mark_attendance(user_id, name, role, branch, designation,
+                                                  session)
+        if not success:
+            self.cooldown.release(user_id, now)
+        return success
+    
+    def mark_attendance_async(self, user_id, name, role, branch=None, designation=None,
+                              callback=None):
+        """Queue attendance for a batched background write.
+        
+        Returns the queued record immediately, or None if the user was
+        already marked this session. callback(record, success) is called
+        from the writer thread once the batch containing the record is
+        committed.
+        """
+        now = datetime.now()
+        if not self.cooldown.try_acquire(user_id, now):
+            return None
+        if self.writer is None:
+            self.writer = AttendanceWriter(self.db_queries, self.batch_size, self.flush_interval)
+        
+        def on_written(record, success):
+            if not success:
+                # Let the next recognition retry the write
+                self.cooldown.release(record['user_id'], record['timestamp'])
+            if callback is not None:
+                callback(record, success)
+        
+        _, session = session_for(now, self.session_minutes)
+        return self.writer.submit(user_id, name, role, branch, designation, on_written,
+                                  timestamp=now, session=session)
+    
+    def flush(self, timeout=None):
+        """Wait until queued attendance has been written"""
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
     
-    def get_attendance_history(self, user_id=None, date=None):
+    def close(self):
+        """Flush queued attendance and stop the background writer"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+    
+    def get_attendance_history(self, user_id=None, date=None, role=None, limit=None):
         """Get attendance history"""
-        return self.db_queries.get_attendance_history(user_id, date)
+        return self.db_queries.get_attendance_history(user_id, date, role, limit)
+    
+    def get_attendance_page(self, user_id=None, date=None, role=None, after=None, limit=200):
+        """Get one keyset-paginated page of attendance history, newest first"""
+        return self.db_queries.get_attendance_page(user_id, date, role, after, limit)
+    
+    @staticmethod
+    def month_bounds(month=None):
+        """Return the first and last day of the month containing month (default: this month)"""
+        month = month or date_type.today()
+        first = month.replace(day=1)
+        last = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+        return first, last
+    
+    @staticmethod
+    def _percentage(present, possible):
+        if present is None or not possible:
+            return None
+        return 100.0 * present / possible
+    
+    def monthly_percentage(self, month=None, role=None, branch=None):
+        """Attendance % for a role and/or branch over a month, from the summary tables.
+        
+        The percentage is user-days present over enrolled users times the
+        days anyone attended that month. branch='' selects users without a
+        branch (teachers). Returns None when there is nothing to compare.
+        """
+        first, last = self.month_bounds(month)
+        rows = self.db_queries.get_monthly_summary(first, role, branch)
+        if rows is None:
+            return None
+        present = sum(row['user_days'] for row in rows)
+        working_days = self.db_queries.count_working_days(first, last)
+        enrolled = self.db_queries.count_users(role, branch)
+        if working_days is None or enrolled is None:
+            return None
+        return self._percentage(present, working_days * enrolled)
+    
+    def branch_percentage(self, branch, month=None, role='student'):
+        """Attendance % for a branch this month (or the month containing month)"""
+        return self.monthly_percentage(month, role, branch)
+    
+    def daily_percentage(self, date=None, role=None, branch=None):
+        """Attendance % of enrolled users present on a day (default: today)"""
+        date = date or date_type.today()
+        present = self.db_queries.count_present(date, date, role=role, branch=branch)
+        return self._percentage(present, self.db_queries.count_users(role, branch))
+    
+    def user_percentage(self, user_id, month=None):
+        """Attendance % for one user over the days anyone attended in a month"""
+        first, last = self.month_bounds(month)
+        present = self.db_queries.count_present(first, last, user_id=user_id)
+        return self._percentage(present, self.db_queries.count_working_days(first, last))
+    
+    def monthly_report(self, month=None):
+        """Return one row per role and branch with user-days, enrollment and percentage"""
+        first, last = self.month_bounds(month)
+        rows = self.db_queries.get_monthly_summary(first) or []
+        working_days = self.db_queries.count_working_days(first, last) or 0
+        report = []
+        for row in rows:
+            enrolled = self.db_queries.count_users(row['role'], row['branch']) or 0
+            report.append({
+                'role': row['role'],
+                'branch': row['branch'],
+                'user_days': row['user_days'],
+                'enrolled': enrolled,
+                'working_days': working_days,
+                'percentage': self._percentage(row['user_days'], enrolled * working_days)
+            })
+        return report
     
     def format_attendance_record(self, record):
         """Format attendance record for display"""
@@ -0,0 +1,102 @@
+"""Write-behind queue for attendance inserts"""
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class AttendanceWriter:
+    """Coalesces attendance events and writes them in batches.
+
+    Events are queued by submit() and written by a background thread with
+    one executemany per batch. A batch is flushed once batch_size events are
+    waiting or flush_interval seconds after its first event, whichever comes
+    first. Pending events are flushed when close() is called or the
+    interpreter exits.
+    """
+
+    def __init__(self, db_queries, batch_size=50, flush_interval=1.0):
+        self.db_queries = db_queries
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='attendance-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, user_id, name, role, branch=None, designation=None, callback=None,
+               timestamp=None, session=''):
+        """Queue an attendance event (stamped now by default); callback(record, success) runs after the write"""
+        if self._closed:
+            raise RuntimeError("Attendance writer is closed")
+        record = {
+            'user_id': user_id,
+            'name': name,
+            'role': role,
+            'branch': branch,
+            'designation': designation,
+            'timestamp': timestamp or datetime.now(),
+            'session': session
+        }
+        self._queue.put((record, callback))
+        return record
+
+    def flush(self, timeout=None):
+        """Block until every event submitted so far has been written"""
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Flush pending events and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        # The exit hook would otherwise keep this writer alive until exit
+        atexit.unregister(self.close)
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, markers = [], []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while True:
+                record, callback = item
+                if record is None:
+                    markers.append(callback)
+                    # A flush request writes what is queued right away
+                    break
+                batch.append((record, callback))
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+            self._write(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        success = self.db_queries.mark_attendance_batch([record for record, _ in batch])
+        for record, callback in batch:
+            if callback is None:
+                continue
+            try:
+                callback(record, success)
+            except Exception as e:
+                print(f"Error in attendance callback: {e}")
@@ -0,0 +1,95 @@
+"""Hands-free attendance from tracked faces, confirmed by temporal voting"""
+from collections import Counter, deque
+
+
+def confident_identity(result, max_distance=0.5, margin=0.06):
+    """Return the user_id a recognition result votes for, or None.
+
+    A result votes only when its best match is within max_distance and the
+    nearest candidate belonging to a different user is at least margin
+    further away; unknown and ambiguous faces abstain.
+    """
+    match = result.get('match')
+    if match is None or match['distance'] > max_distance:
+        return None
+    for candidate in result.get('candidates', []):
+        if candidate['user_id'] != match['user_id']:
+            if candidate['distance'] - match['distance'] < margin:
+                return None
+            break
+    return match['user_id']
+
+
+class _TrackVotes:
+    def __init__(self, window):
+        self.votes = deque(maxlen=window)
+        self.encode_count = -1
+        self.confirmed = False
+
+
+class AutoAttendance:
+    """Marks attendance once a track shows the same identity in K of its last N observations.
+
+    Observations that are unknown or ambiguous abstain, and a track whose
+    window holds votes for more than one identity is never confirmed.
+
+    Feed it FaceTracker results for every processed frame. Only fresh
+    encodings count as observations (a track's cached identity is not
+    re-counted on frames where it was not encoded), so the tracker should
+    re-encode periodically, e.g. FaceTracker(reencode_every=1). Each track
+    is marked at most once; the attendance tracker's cooldown handles the
+    same person coming back as a new track, and such tracks are not
+    reported as confirmed.
+    """
+
+    def __init__(self, attendance_tracker, votes_required=3, window=5, max_distance=0.5,
+                 margin=0.06):
+        self.attendance_tracker = attendance_tracker
+        self.votes_required = votes_required
+        self.window = window
+        self.max_distance = max_distance
+        self.margin = margin
+        self._tracks = {}
+
+    def reset(self):
+        self._tracks = {}
+
+    def update(self, results, callback=None):
+        """Vote on one frame of results; return the matches confirmed by this frame"""
+        confirmed = []
+        seen = set()
+        for result in results:
+            track_id = result.get('track_id')
+            if track_id is None:
+                continue
+            seen.add(track_id)
+            state = self._tracks.get(track_id)
+            if state is None:
+                state = self._tracks[track_id] = _TrackVotes(self.window)
+            encode_count = result.get('encode_count', 0)
+            if state.confirmed or encode_count == state.encode_count:
+                continue
+            state.encode_count = encode_count
+            vote = confident_identity(result, self.max_distance, self.margin)
+            state.votes.append(vote)
+            if vote is None:
+                continue
+
+            # A track that has voted for two people in its window is not trusted
+            counts = Counter(user_id for user_id in state.votes if user_id is not None)
+            if len(counts) > 1 or counts[vote] < self.votes_required:
+                continue
+            match = result['match']
+            record = self.attendance_tracker.mark_attendance_async(
+                match['user_id'], match['name'], match['role'],
+                match.get('branch'), match.get('designation'), callback=callback
+            )
+            # None means the cooldown already covers this user; nothing was marked
+            if record is not None:
+                state.confirmed = True
+                confirmed.append(match)
+
+        # Forget tracks the tracker has dropped
+        for track_id in [track_id for track_id in self._tracks if track_id not in seen]:
+            del self._tracks[track_id]
+        return confirmed
@@ -0,0 +1,83 @@
+"""Background camera capture with a latest-frame ring buffer"""
+import threading
+import time
+from collections import deque
+import cv2
+
+
+class FrameGrabber:
+    """Reads frames from a cv2.VideoCapture source on its own thread.
+
+    Only the newest buffer_size frames are kept, so a slow consumer always
+    sees a recent frame instead of a growing backlog. Every frame gets an
+    increasing sequence number so consumers can tell whether it is new.
+    """
+
+    def __init__(self, source=0, buffer_size=2):
+        self.source = source
+        self.capture = cv2.VideoCapture(source)
+        self._frames = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._running = False
+        self._thread = None
+        self.fps = 0.0
+
+    def is_opened(self):
+        """Check whether the capture source could be opened"""
+        return self.capture is not None and self.capture.isOpened()
+
+    def start(self):
+        """Start the capture thread"""
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='frame-grabber', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        last_time = time.monotonic()
+        while self._running:
+            ret, frame = self.capture.read()
+            if not ret:
+                # Camera hiccup or end of file; avoid spinning on a dead source
+                time.sleep(0.01)
+                continue
+            now = time.monotonic()
+            elapsed = now - last_time
+            last_time = now
+            if elapsed > 0:
+                # Exponential moving average keeps the reading stable
+                self.fps = 0.9 * self.fps + 0.1 * (1.0 / elapsed) if self.fps else 1.0 / elapsed
+            with self._condition:
+                self._sequence += 1
+                self._frames.append((self._sequence, frame))
+                self._condition.notify_all()
+
+    def latest(self):
+        """Return (sequence, frame) of the newest frame, or (0, None) before the first one"""
+        with self._condition:
+            if not self._frames:
+                return 0, None
+            return self._frames[-1]
+
+    def wait_for_frame(self, after_sequence, timeout=None):
+        """Block until a frame newer than after_sequence arrives and return it"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > after_sequence or not self._running,
+                                     timeout)
+            if not self._frames or self._sequence <= after_sequence:
+                return after_sequence, None
+            return self._frames[-1]
+
+    def stop(self):
+        """Stop the capture thread and release the source"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self.capture is not None:
+            self.capture.release()
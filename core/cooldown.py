@@ -0,0 +1,89 @@
+"""In-memory per-user attendance cooldown"""
+import threading
+from datetime import datetime, timedelta
+
+
+def session_for(timestamp, session_minutes=None):
+    """Return the (date, session) an attendance timestamp belongs to.
+
+    A session is the whole calendar day (session '') or, with
+    session_minutes, a fixed window of the day numbered from midnight.
+    """
+    if not session_minutes:
+        return timestamp.date(), ''
+    midnight = datetime.combine(timestamp.date(), datetime.min.time())
+    window = int((timestamp - midnight).total_seconds() // (session_minutes * 60))
+    return timestamp.date(), str(window)
+
+
+def session_end(timestamp, session_minutes=None):
+    """Return the datetime at which the session containing timestamp ends"""
+    midnight = datetime.combine(timestamp.date(), datetime.min.time())
+    if not session_minutes:
+        return midnight + timedelta(days=1)
+    date, window = session_for(timestamp, session_minutes)
+    end = midnight + timedelta(minutes=session_minutes * (int(window) + 1))
+    return min(end, midnight + timedelta(days=1))
+
+
+class AttendanceCooldown:
+    """Remembers who was marked in the current session so repeats skip the database.
+
+    Entries are keyed by (user_id, date, session) and expire at the end of
+    their session, or after ttl_seconds if that comes first. The cache is
+    per process; the unique key on the attendance table keeps several
+    kiosks consistent.
+    """
+
+    def __init__(self, session_minutes=None, ttl_seconds=None):
+        self.session_minutes = session_minutes
+        self.ttl_seconds = ttl_seconds
+        self._expiry = {}
+        self._lock = threading.Lock()
+        self._next_prune = None
+
+    def key(self, user_id, timestamp):
+        date, session = session_for(timestamp, self.session_minutes)
+        return user_id, date, session
+
+    def is_marked(self, user_id, timestamp=None):
+        """Return True if user_id was marked in the session containing timestamp"""
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            expires = self._expiry.get(self.key(user_id, timestamp))
+        return expires is not None and expires > timestamp
+
+    def try_acquire(self, user_id, timestamp=None):
+        """Record user_id as marked; return False if already marked this session"""
+        timestamp = timestamp or datetime.now()
+        key = self.key(user_id, timestamp)
+        expires = session_end(timestamp, self.session_minutes)
+        if self.ttl_seconds is not None:
+            expires = min(expires, timestamp + timedelta(seconds=self.ttl_seconds))
+        with self._lock:
+            self._prune(timestamp)
+            current = self._expiry.get(key)
+            if current is not None and current > timestamp:
+                return False
+            self._expiry[key] = expires
+            return True
+
+    def release(self, user_id, timestamp):
+        """Forget a mark, e.g. because writing it failed"""
+        with self._lock:
+            self._expiry.pop(self.key(user_id, timestamp), None)
+
+    def clear(self):
+        with self._lock:
+            self._expiry.clear()
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def _prune(self, now):
+        # Expired entries are dropped at most once a minute
+        if self._next_prune is not None and now < self._next_prune:
+            return
+        self._next_prune = now + timedelta(minutes=1)
+        for key in [key for key, expires in self._expiry.items() if expires <= now]:
+            del self._expiry[key]
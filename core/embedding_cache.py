@@ -0,0 +1,183 @@
+"""Memory-mapped on-disk cache of the face gallery"""
+import json
+import os
+import time
+import numpy as np
+from core.gallery_index import ENCODING_DIM
+from core.templates import group_templates
+from utils.encoder import bytes_to_encode
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.face_attendance', 'gallery')
+CACHE_VERSION = 3
+USER_FIELDS = ('user_id', 'name', 'role', 'branch', 'designation')
+
+
+class EmbeddingCache:
+    """Gallery snapshot stored as a raw float32 matrix plus a JSON sidecar.
+
+    The matrix is one little-endian float32 row per template, with each
+    user's templates on consecutive rows, and is opened with numpy.memmap,
+    so loading costs no copy and no decoding. metadata.json holds the user
+    fields and template counts in row order, the users.updated_at
+    watermark of the snapshot, which sync() uses to fetch only users
+    changed since then, and the name of the matrix file.
+
+    Every save writes its matrix to a new embeddings.<generation>.f32 file
+    and then replaces metadata.json, so that rename is the single commit
+    point: a reader or a crash sees either the old metadata with the old
+    matrix or the new metadata with the new one, never a mix.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self.metadata_path = os.path.join(directory, 'metadata.json')
+
+    def load(self):
+        """Return (matrix, metadata) from disk, or None if the cache is missing or stale"""
+        # A save finishing between reading the metadata and opening its
+        # matrix may have removed that generation; the new metadata names
+        # the new one, so read again once
+        for attempt in range(2):
+            if not os.path.exists(self.metadata_path):
+                return None
+            try:
+                return self._load()
+            except FileNotFoundError as e:
+                if attempt:
+                    print(f"Ignoring embedding cache: {e}")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring embedding cache: {e}")
+                return None
+        return None
+
+    def _load(self):
+        with open(self.metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        count = metadata['count']
+        if metadata.get('version') != CACHE_VERSION or metadata.get('dim') != ENCODING_DIM:
+            return None
+        if count == 0:
+            return np.empty((0, ENCODING_DIM), dtype=np.float32), metadata
+        embeddings_path = os.path.join(self.directory, metadata['embeddings'])
+        if os.path.getsize(embeddings_path) != count * ENCODING_DIM * 4:
+            return None
+        matrix = np.memmap(embeddings_path, dtype='<f4', mode='r', shape=(count, ENCODING_DIM))
+        return matrix, metadata
+
+    def save(self, matrix, users, counts, watermark):
+        """Atomically replace the cache with matrix, its users and their template counts"""
+        os.makedirs(self.directory, exist_ok=True)
+        matrix = np.ascontiguousarray(matrix, dtype='<f4').reshape(-1, ENCODING_DIM)
+        embeddings_name = f"embeddings.{time.time_ns()}-{os.getpid()}.f32"
+        metadata = {
+            'version': CACHE_VERSION,
+            'dim': ENCODING_DIM,
+            'count': matrix.shape[0],
+            'embeddings': embeddings_name,
+            'watermark': watermark,
+            'users': [{field: user.get(field) for field in USER_FIELDS} for user in users],
+            'counts': [int(count) for count in counts],
+        }
+
+        # The matrix goes to a file no metadata names yet and reaches the
+        # disk before the metadata rename publishes it
+        with open(os.path.join(self.directory, embeddings_name), 'wb') as f:
+            matrix.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        metadata_tmp = f"{self.metadata_path}.{os.getpid()}.tmp"
+        with open(metadata_tmp, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        os.replace(metadata_tmp, self.metadata_path)
+        self._remove_old_generations(embeddings_name)
+
+    def _remove_old_generations(self, current):
+        """Delete matrix files the metadata no longer names.
+
+        Processes still mapping an old generation keep their mapping on
+        POSIX; where the file cannot be deleted yet (Windows) it is
+        retried on the next save.
+        """
+        for name in os.listdir(self.directory):
+            if name.startswith('embeddings.') and name.endswith('.f32') and name != current:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def sync(self, db_queries):
+        """Bring the cache up to date with the users and face_templates tables.
+
+        Only users whose updated_at is at or after the stored watermark are
+        fetched and decoded, together with their templates; users enrolled
+        before templates existed contribute their single face_encoding.
+        Deleted users are detected from a BLOB-free user_id listing.
+        Returns (matrix, users, counts) where counts[i] is the number of
+        consecutive matrix rows belonging to users[i] and matrix is a
+        read-only memmap when nothing changed. If the database cannot be
+        reached the last snapshot is returned as is.
+        """
+        cached = self.load()
+        if cached is None:
+            matrix = np.empty((0, ENCODING_DIM), dtype=np.float32)
+            metadata = {'watermark': None, 'users': [], 'counts': []}
+        else:
+            matrix, metadata = cached
+        users, counts = metadata['users'], metadata['counts']
+
+        changed = db_queries.get_users_modified_since(metadata['watermark'])
+        enrolled_ids = db_queries.get_enrolled_user_ids()
+        if changed is None or enrolled_ids is None:
+            return matrix, users, counts
+        template_rows = db_queries.get_face_templates(
+            None if metadata['watermark'] is None else [user['user_id'] for user in changed])
+        if template_rows is None:
+            return matrix, users, counts
+        templates = group_templates(template_rows)
+
+        enrolled_ids = set(enrolled_ids)
+        updates = {}
+        watermark = metadata['watermark']
+        for user in changed:
+            encodings = templates.get(user['user_id'])
+            if not encodings:
+                face_encoding = bytes_to_encode(user['face_encoding'])
+                if face_encoding is None:
+                    continue
+                encodings = [face_encoding]
+            updates[user['user_id']] = (user, np.asarray(encodings, dtype=np.float32))
+            updated_at = str(user['updated_at'])
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+
+        # Rows re-fetched because they share the watermark second are not real changes
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        row_of = {user['user_id']: row for row, user in enumerate(users)}
+        updates = {user_id: update for user_id, update in updates.items()
+                   if user_id not in row_of
+                   or not np.array_equal(matrix[offsets[row_of[user_id]]:
+                                                offsets[row_of[user_id] + 1]], update[1])
+                   or any(users[row_of[user_id]].get(field) != update[0].get(field)
+                          for field in USER_FIELDS)}
+        removed = set(row_of) - enrolled_ids
+        if not updates and not removed and watermark == metadata['watermark']:
+            return matrix, users, counts
+
+        keep = [row for row, user in enumerate(users)
+                if user['user_id'] not in removed and user['user_id'] not in updates]
+        new_users = [users[row] for row in keep]
+        new_counts = [counts[row] for row in keep]
+        new_rows = [matrix[offsets[row]:offsets[row + 1]] for row in keep]
+        for user, encodings in updates.values():
+            new_users.append(user)
+            new_counts.append(encodings.shape[0])
+            new_rows.append(encodings)
+        new_matrix = (np.concatenate(new_rows) if new_rows
+                      else np.empty((0, ENCODING_DIM), dtype=np.float32))
+
+        # Drop references to the old mapping so its file can be removed
+        cached = matrix = new_rows = None
+        self.save(new_matrix, new_users, new_counts, watermark)
+        reloaded = self.load()
+        new_users = [{field: user.get(field) for field in USER_FIELDS} for user in new_users]
+        return (reloaded[0] if reloaded is not None else new_matrix), new_users, new_counts
@@ -1,84 +1,243 @@
 """Core face recognition functionality"""
+import threading
 import cv2
 import face_recognition
 import numpy as np
 from utils.encoder import bytes_to_encode, compare_faces
-from database.db_queries import DatabaseQueries
+from database.storage import create_queries
+from core.gallery import FaceGallery
+from core.templates import group_templates
+from core.gallery_index import create_index
+from core.embedding_cache import DEFAULT_CACHE_DIR, USER_FIELDS, EmbeddingCache
+from utils.profiles import get_profile
+from utils.metrics import metrics
+
+# Frames are downscaled by this factor before detection and encoding,
+# unless the speed profile says otherwise
+FRAME_SCALE = get_profile('balanced').frame_scale
+
+def downscale_frame(frame, scale=FRAME_SCALE):
+    """Downscale a BGR frame and convert it to RGB for detection and encoding"""
+    small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+    return cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
 
 class FaceRecognizer:
-    def __init__(self):
-        self.db_queries = DatabaseQueries()
-        self.known_face_encodings = []
-        self.known_face_ids = []
-        self.known_face_names = []
-        self.known_face_roles = []
-        self.known_face_branches = []
-        self.known_face_designations = []
+    def __init__(self, top_k=3, index='brute', index_options=None, cache_dir=DEFAULT_CACHE_DIR,
+                 db_queries=None, template_reduce='min', profile=None, sync_cache=True):
+        self.db_queries = db_queries if db_queries is not None else create_queries()
+        self.top_k = top_k
+        # How a user's templates combine into one distance: 'min' or 'mean'
+        self.template_reduce = template_reduce
+        self.set_profile(profile)
+        self.embedding_cache = EmbeddingCache(cache_dir) if cache_dir else None
+        # Workers whose parent already synced the cache only map the snapshot,
+        # so several processes never race to rewrite it
+        self.sync_cache = sync_cache
+        self.index_name = index
+        self.index_options = index_options or {}
+        # Serializes gallery writers; readers never take it
+        self._gallery_lock = threading.Lock()
+        self.gallery = FaceGallery(index=create_index(index, **self.index_options))
         self.load_known_faces()
     
+    def set_profile(self, profile=None):
+        """Switch detection and encoding settings to a speed profile (see utils.profiles)"""
+        self.profile = get_profile(profile)
+        self.frame_scale = self.profile.frame_scale
+    
     def load_known_faces(self):
-        """Load all known faces from database"""
+        """Load all known faces, from the embedding cache when one is configured"""
+        if self.embedding_cache is not None and self.sync_cache:
+            matrix, users, counts = self.embedding_cache.sync(self.db_queries)
+            self.load_gallery(matrix, users, counts)
+            return
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.load()
+            if cached is not None:
+                matrix, metadata = cached
+                self.load_gallery(matrix, metadata['users'], metadata['counts'])
+                return
+            # No usable snapshot: read the database without writing the cache
+        
         users = self.db_queries.get_all_users()
-        self.known_face_encodings = []
-        self.known_face_ids = []
-        self.known_face_names = []
-        self.known_face_roles = []
-        self.known_face_branches = []
-        self.known_face_designations = []
+        templates = group_templates(self.db_queries.get_face_templates())
+        encodings = []
+        labels = []
+        known_users = []
         
         for user in users:
-            face_encoding = bytes_to_encode(user['face_encoding'])
-            if face_encoding is not None:
-                self.known_face_encodings.append(face_encoding)
-                self.known_face_ids.append(user['user_id'])
-                self.known_face_names.append(user['name'])
-                self.known_face_roles.append(user['role'])
-                self.known_face_branches.append(user.get('branch', ''))
-                self.known_face_designations.append(user.get('designation', ''))
+            # Users enrolled before templates existed have only face_encoding
+            user_templates = templates.get(user['user_id'])
+            if not user_templates:
+                face_encoding = bytes_to_encode(user['face_encoding'])
+                user_templates = [face_encoding] if face_encoding is not None else []
+            if user_templates:
+                encodings.extend(user_templates)
+                labels.extend([len(known_users)] * len(user_templates))
+                # Keep the user fields only, not the encoding BLOB
+                known_users.append(self._known_user(user))
+        
+        self._swap_gallery(encodings, known_users, labels)
     
-    def recognize_face(self, frame, tolerance=0.6):
-        """Recognize face in frame and return user info"""
+    def load_gallery(self, matrix, users, counts=None):
+        """Replace the gallery with matrix rows and their user dicts, without database I/O.
+        
+        counts[i] is the number of consecutive rows holding users[i]'s
+        templates; by default every user has exactly one row.
+        """
+        labels = np.repeat(np.arange(len(users)), counts) if counts is not None else None
+        self._swap_gallery(matrix, users, labels)
+    
+    def _swap_gallery(self, encodings, users, labels):
+        """Build a new gallery and publish it with one assignment.
+        
+        Threads matching concurrently keep using the gallery they started
+        with, so readers never see rows and users out of step.
+        """
+        gallery = FaceGallery(encodings, index=create_index(self.index_name, **self.index_options),
+                              labels=labels, users=users)
+        with self._gallery_lock:
+            self.gallery = gallery
+    
+    def add_user(self, user, encodings):
+        """Add a user and their templates to the gallery without reloading it"""
+        with self._gallery_lock:
+            self.gallery = self.gallery.add(self._known_user(user), encodings)
+    
+    def update_user(self, user, encodings):
+        """Replace a user's details and templates in the gallery, adding them if unknown"""
+        user = self._known_user(user)
+        with self._gallery_lock:
+            if user['user_id'] in self.gallery:
+                self.gallery = self.gallery.update(user, encodings)
+            else:
+                self.gallery = self.gallery.add(user, encodings)
+    
+    def remove_user(self, user_id):
+        """Drop a user from the gallery; return whether they were in it"""
+        with self._gallery_lock:
+            if user_id not in self.gallery:
+                return False
+            self.gallery = self.gallery.remove(user_id)
+            return True
+    
+    @staticmethod
+    def _known_user(user):
+        return {field: user.get(field) for field in USER_FIELDS}
+    
+    @staticmethod
+    def _user_info(gallery, index, distance):
+        """Build the user info dict for a gallery identity"""
+        user = gallery.users[index]
+        return {
+            'user_id': user['user_id'],
+            'name': user['name'],
+            'role': user['role'],
+            'branch': user.get('branch', ''),
+            'designation': user.get('designation', ''),
+            'distance': float(distance)
+        }
+    
+    def match_encodings(self, face_encodings, tolerance=0.6):
+        """Match encodings against every template in one vectorized pass.
+        
+        Template distances are reduced per user (see template_reduce).
+        Returns one entry per encoding: the nearest user info (or None when
+        the nearest distance exceeds tolerance) and the top-k candidate users.
+        """
+        gallery = self.gallery
+        with metrics.timer('match'):
+            indices, distances = gallery.search_identities(face_encodings, k=self.top_k,
+                                                           reduce=self.template_reduce)
+            matches = []
+            for row_indices, row_distances in zip(indices, distances):
+                candidates = [self._user_info(gallery, index, distance)
+                              for index, distance in zip(row_indices, row_distances)
+                              if index >= 0]
+                best = candidates[0] if candidates and candidates[0]['distance'] <= tolerance else None
+                matches.append((best, candidates))
+        if metrics.enabled:
+            recognized = sum(1 for best, _ in matches if best is not None)
+            metrics.counter('faces_recognized').inc(recognized)
+            metrics.counter('faces_unknown').inc(len(matches) - recognized)
+        return matches
+    
+    def prepare_frame(self, frame):
+        """Downscale a BGR frame and convert it to RGB for detection and encoding"""
         # Resize frame for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        with metrics.timer('resize'):
+            return downscale_frame(frame, self.frame_scale)
+    
+    def detect_faces(self, rgb_small_frame):
+        """Find face locations in a prepared frame, in full-frame coordinates"""
+        with metrics.timer('detect'):
+            face_locations = face_recognition.face_locations(
+                rgb_small_frame, number_of_times_to_upsample=self.profile.upsample,
+                model=self.profile.model)
         
+        # Scale back up face locations
+        return [tuple(int(value / self.frame_scale) for value in location)
+                for location in face_locations]
+    
+    def encode_faces(self, rgb_small_frame, face_locations):
+        """Compute encodings for full-frame face locations in a prepared frame"""
+        small_locations = [tuple(int(value * self.frame_scale) for value in location)
+                           for location in face_locations]
+        with metrics.timer('encode'):
+            return face_recognition.face_encodings(
+                rgb_small_frame, small_locations, num_jitters=self.profile.jitters,
+                model=self.profile.landmarks)
+    
+    def recognize_faces(self, frame, tolerance=0.6):
+        """Recognize every face in frame and return one result per face"""
+        with metrics.timer('recognize'):
+            return self.recognize_prepared(self.prepare_frame(frame), tolerance)
+    
+    def recognize_prepared(self, rgb_small_frame, tolerance=0.6):
+        """Recognize every face in a frame already passed through prepare_frame"""
         # Find face locations
-        face_locations = face_recognition.face_locations(rgb_small_frame)
+        face_locations = self.detect_faces(rgb_small_frame)
         
         if len(face_locations) == 0:
-            return None
+            return []
         
         # Get face encodings
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+        face_encodings = self.encode_faces(rgb_small_frame, face_locations)
         
         if len(face_encodings) == 0:
-            return None
+            return []
         
-        # Scale back up face locations
-        face_locations = [(top*4, right*4, bottom*4, left*4) 
-                         for (top, right, bottom, left) in face_locations]
-        
-        # Compare with known faces
-        for face_encoding, face_location in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(
-                self.known_face_encodings, face_encoding, tolerance=tolerance
-            )
-            
-            if True in matches:
-                match_index = matches.index(True)
-                return {
-                    'user_id': self.known_face_ids[match_index],
-                    'name': self.known_face_names[match_index],
-                    'role': self.known_face_roles[match_index],
-                    'branch': self.known_face_branches[match_index],
-                    'designation': self.known_face_designations[match_index],
-                    'location': face_location,
-                    'encoding': face_encoding
-                }
-        
-        return None
+        results = []
+        matches = self.match_encodings(face_encodings, tolerance)
+        for face_encoding, face_location, (best, candidates) in zip(
+                face_encodings, face_locations, matches):
+            results.append({
+                'match': best,
+                'candidates': candidates,
+                'location': face_location,
+                'encoding': face_encoding
+            })
+        return results
+    
+    @staticmethod
+    def best_match(results):
+        """Reduce recognize_faces results to the user info of the closest match"""
+        best_result = None
+        for result in results:
+            match = result['match']
+            if match is None:
+                continue
+            if best_result is None or match['distance'] < best_result['distance']:
+                best_result = dict(match)
+                best_result['location'] = result['location']
+                best_result['encoding'] = result['encoding']
+                best_result['candidates'] = result['candidates']
+        return best_result
+    
+    def recognize_face(self, frame, tolerance=0.6):
+        """Recognize face in frame and return user info of the closest match"""
+        return self.best_match(self.recognize_faces(frame, tolerance))
     
     def refresh_database(self):
         """Refresh known faces from database"""
         self.load_known_faces()
-
@@ -0,0 +1,272 @@
+"""Contiguous face gallery with vectorized nearest-neighbour search"""
+import numpy as np
+from core.gallery_index import ENCODING_DIM, squared_norms, create_index, exact_search
+
+TEMPLATE_REDUCTIONS = ('min', 'mean')
+
+# Removed rows are skipped at search time until there are this many, or
+# this fraction of all rows, then the gallery is compacted; each one widens
+# every search by one row
+MIN_DEAD_ROWS = 256
+MAX_DEAD_RATIO = 0.01
+# Rows appended after an expensive index (IVF) was built are scanned
+# exactly until they exceed this many, or this fraction of the indexed rows
+MIN_TAIL_ROWS = 1024
+MAX_TAIL_RATIO = 0.1
+MIN_CAPACITY = 16
+
+
+class _GalleryBuffers:
+    """Append-only storage shared by successive snapshots of one gallery.
+
+    A snapshot only ever reads rows below its own row count, so appending
+    never disturbs readers. Outgrowing an array moves to a new one of
+    double the capacity and leaves older snapshots on the old array.
+    identity_of maps user_id to the identity number currently holding the
+    user; only the newest snapshot's view of it is meaningful.
+    """
+
+    def __init__(self, rows=0, identities=0):
+        self.matrix = np.empty((max(rows, MIN_CAPACITY), ENCODING_DIM), dtype=np.float32)
+        self.sq_norms = np.empty(max(rows, MIN_CAPACITY), dtype=np.float32)
+        self.labels = np.empty(max(rows, MIN_CAPACITY), dtype=np.int64)
+        self.starts = np.empty(max(identities, MIN_CAPACITY), dtype=np.int64)
+        self.counts = np.empty(max(identities, MIN_CAPACITY), dtype=np.int64)
+        self.users = []
+        self.identity_of = {}
+        self.n_rows = 0
+        self.n_identities = 0
+
+    def _grow(self, name, used, needed):
+        array = getattr(self, name)
+        if needed <= array.shape[0]:
+            return
+        grown = np.empty((max(needed, 2 * array.shape[0]),) + array.shape[1:], dtype=array.dtype)
+        grown[:used] = array[:used]
+        setattr(self, name, grown)
+
+    def append(self, user, encodings):
+        """Store one identity's rows after the last row and return its identity number"""
+        end = self.n_rows + encodings.shape[0]
+        for name in ('matrix', 'sq_norms', 'labels'):
+            self._grow(name, self.n_rows, end)
+        for name in ('starts', 'counts'):
+            self._grow(name, self.n_identities, self.n_identities + 1)
+        identity = self.n_identities
+        self.matrix[self.n_rows:end] = encodings
+        self.sq_norms[self.n_rows:end] = squared_norms(encodings)
+        self.labels[self.n_rows:end] = identity
+        self.starts[identity] = self.n_rows
+        self.counts[identity] = encodings.shape[0]
+        self.users.append(user)
+        self.identity_of[user['user_id']] = identity
+        self.n_rows = end
+        self.n_identities += 1
+        return identity
+
+
+class FaceGallery:
+    """Known face encodings stored as one contiguous float32 matrix.
+
+    A person may own several rows (templates); labels maps every row to
+    its identity number, and search_identities ranks identities rather
+    than rows. users optionally holds the user dict of every identity.
+
+    A gallery object is a snapshot: add(), update() and remove() return a
+    new snapshot sharing storage with this one, so a thread still
+    searching the old snapshot never sees a half-applied change. Only the
+    newest snapshot may be changed.
+    """
+
+    def __init__(self, encodings=None, index=None, labels=None, users=None):
+        self.index = index if index is not None else create_index('brute')
+        self.load(encodings if encodings is not None else [], labels, users)
+
+    def load(self, encodings, labels=None, users=None):
+        """Replace the gallery contents with encodings, one identity per row unless labelled"""
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        n_rows = matrix.shape[0]
+        if labels is None:
+            labels = np.arange(n_rows)
+        labels = np.asarray(labels, dtype=np.int64)
+        n_identities = max(int(labels.max()) + 1 if n_rows else 0,
+                           len(users) if users is not None else 0)
+        counts = np.bincount(labels, minlength=n_identities)
+
+        # Store each identity's rows consecutively
+        order = np.argsort(labels, kind='stable')
+        buffers = _GalleryBuffers(n_rows, n_identities)
+        buffers.matrix[:n_rows] = matrix[order]
+        buffers.sq_norms[:n_rows] = squared_norms(buffers.matrix[:n_rows])
+        buffers.labels[:n_rows] = labels[order]
+        buffers.starts[:n_identities] = np.cumsum(counts) - counts
+        buffers.counts[:n_identities] = counts
+        buffers.users = list(users) if users is not None else [None] * n_identities
+        buffers.identity_of = {user['user_id']: identity
+                               for identity, user in enumerate(buffers.users) if user is not None}
+        buffers.n_rows = n_rows
+        buffers.n_identities = n_identities
+        self._set_state(buffers, np.empty(0, dtype=np.int64), 0, self.index, 0)
+
+    def _set_state(self, buffers, dead, removed_identities, index, indexed_rows):
+        self._buffers = buffers
+        self.matrix = buffers.matrix[:buffers.n_rows]
+        self.sq_norms = buffers.sq_norms[:buffers.n_rows]
+        self.labels = buffers.labels[:buffers.n_rows]
+        self.starts = buffers.starts[:buffers.n_identities]
+        self.counts = buffers.counts[:buffers.n_identities]
+        self.users = buffers.users
+        self._total_identities = buffers.n_identities
+        # Sorted rows of removed or replaced identities, skipped by search
+        self.dead = dead
+        self._removed_identities = removed_identities
+        self.n_identities = buffers.n_identities - removed_identities
+        self.max_templates = int(self.counts.max()) if len(self.counts) else 1
+        if index.cheap_build or indexed_rows == 0:
+            index.build(self.matrix, self.sq_norms)
+            indexed_rows = self.matrix.shape[0]
+        self.index = index
+        self.indexed_rows = indexed_rows
+
+    def __len__(self):
+        return self.matrix.shape[0] - len(self.dead)
+
+    def __contains__(self, user_id):
+        identity = self._buffers.identity_of.get(user_id)
+        return identity is not None and identity < self._total_identities
+
+    def add(self, user, encodings):
+        """Return a snapshot with a new identity for user holding encodings as its templates"""
+        if user['user_id'] in self:
+            raise ValueError(f"User {user['user_id']} is already in the gallery")
+        return self._changed(user, encodings)
+
+    def update(self, user, encodings):
+        """Return a snapshot where user's details and templates are replaced"""
+        if user['user_id'] not in self:
+            raise KeyError(user['user_id'])
+        return self._changed(user, encodings, replaces=user['user_id'])
+
+    def remove(self, user_id):
+        """Return a snapshot without user_id"""
+        if user_id not in self:
+            raise KeyError(user_id)
+        return self._changed(None, None, replaces=user_id)
+
+    def _changed(self, user, encodings, replaces=None):
+        """Retire replaces' rows and/or append user's rows, then publish a new snapshot.
+
+        Costs O(templates + dead rows), not O(gallery): retired rows stay
+        in storage as dead rows and new rows go after the last one. When
+        too many rows are dead, or too many were appended past an index
+        that is expensive to rebuild, the result is compacted instead.
+        """
+        buffers = self._buffers
+        if buffers.n_rows != self.matrix.shape[0] or buffers.n_identities != self._total_identities:
+            raise RuntimeError("Gallery snapshot is stale; change the newest snapshot")
+
+        dead, removed = self.dead, self._removed_identities
+        if replaces is not None:
+            identity = buffers.identity_of.pop(replaces)
+            start = buffers.starts[identity]
+            retired = np.arange(start, start + buffers.counts[identity], dtype=np.int64)
+            dead, removed = np.union1d(dead, retired), removed + 1
+        if user is not None:
+            buffers.append(user, np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM))
+
+        gallery = FaceGallery.__new__(FaceGallery)
+        # An index is shared with the old snapshot unless it is rebuilt from scratch
+        rebuild = self.index.cheap_build or self.indexed_rows == 0
+        index = self.index.clone() if rebuild else self.index
+        gallery._set_state(buffers, dead, removed, index, self.indexed_rows)
+        tail = buffers.n_rows - gallery.indexed_rows
+        if (len(dead) > max(MIN_DEAD_ROWS, MAX_DEAD_RATIO * buffers.n_rows)
+                or tail > max(MIN_TAIL_ROWS, MAX_TAIL_RATIO * gallery.indexed_rows)):
+            return gallery.compacted()
+        return gallery
+
+    def compacted(self):
+        """Return a snapshot with dead rows dropped and the index rebuilt over every row"""
+        alive = np.ones(self.matrix.shape[0], dtype=bool)
+        alive[self.dead] = False
+        rows = np.flatnonzero(alive)
+        # Identities keep their order; renumber them densely
+        live, labels = np.unique(self.labels[rows], return_inverse=True)
+        return FaceGallery(self.matrix[rows], index=self.index.clone(), labels=labels,
+                           users=[self.users[identity] for identity in live])
+
+    def search(self, queries, k=1):
+        """Return (indices, distances) of the k nearest live encodings per query"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_dead = len(self.dead)
+        has_tail = self.indexed_rows < self.matrix.shape[0]
+        # Ask for enough extra rows that dead ones can be dropped afterwards
+        rows, distances = self.index.search(queries, k + n_dead)
+        if has_tail:
+            tail_rows, tail_distances = exact_search(
+                self.matrix[self.indexed_rows:], self.sq_norms[self.indexed_rows:], queries,
+                k + n_dead, self.index.chunk_size)
+            rows = np.concatenate([rows, tail_rows + self.indexed_rows], axis=1)
+            distances = np.concatenate([distances, tail_distances], axis=1)
+        if n_dead:
+            dead = np.isin(rows, self.dead)
+            rows = np.where(dead, -1, rows)
+            distances = np.where(dead, np.inf, distances).astype(np.float32)
+        if n_dead or has_tail:
+            order = np.argsort(distances, axis=1, kind='stable')[:, :min(k, len(self))]
+            rows = np.take_along_axis(rows, order, axis=1)
+            distances = np.take_along_axis(distances, order, axis=1)
+        return rows, distances
+
+    def search_identities(self, queries, k=1, reduce='min'):
+        """Return (identities, distances) of the k nearest identities per query.
+
+        One index search over every template fetches the k * max_templates
+        nearest rows, which always contains the best template of each of
+        the k nearest identities. reduce='min' scores an identity by its
+        closest template; reduce='mean' by its mean distance over all its
+        templates, computed exactly for the shortlisted identities. Missing
+        results are padded with -1 and infinite distance.
+        """
+        if reduce not in TEMPLATE_REDUCTIONS:
+            raise ValueError(f"Unknown template reduction '{reduce}', expected one of "
+                             f"{TEMPLATE_REDUCTIONS}")
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        rows, row_distances = self.search(queries, k * self.max_templates)
+        if self.max_templates == 1 and reduce == 'min':
+            # One template per identity: rows already rank identities
+            identities = np.where(rows >= 0, self.labels[np.maximum(rows, 0)], -1)
+            return identities, row_distances
+
+        n_queries = queries.shape[0]
+        k = min(k, self.n_identities)
+        identities = np.full((n_queries, k), -1, dtype=np.int64)
+        distances = np.full((n_queries, k), np.inf, dtype=np.float32)
+        for i in range(n_queries):
+            found = rows[i][rows[i] >= 0]
+            labels, first = np.unique(self.labels[found], return_index=True)
+            if reduce == 'min':
+                # Rows come sorted by distance, so an identity's first row is its best
+                order = np.argsort(first)[:k]
+                candidates, scores = labels[order], row_distances[i][first[order]]
+            else:
+                candidates, scores = self._mean_distances(queries[i], labels, k)
+            identities[i, :len(candidates)] = candidates
+            distances[i, :len(candidates)] = scores
+        return identities, distances
+
+    def _mean_distances(self, query, candidates, k):
+        """Rank candidate identities by mean distance over all of their templates"""
+        if not len(candidates):
+            # Nothing live was found, e.g. an empty gallery or an empty IVF probe
+            return candidates, np.empty(0, dtype=np.float32)
+        starts, counts = self.starts[candidates], self.counts[candidates]
+        rows = np.concatenate([np.arange(start, start + count)
+                               for start, count in zip(starts, counts)])
+        templates = self.matrix[rows]
+        row_distances = np.sqrt(np.maximum(
+            self.sq_norms[rows] + query @ query - 2.0 * (templates @ query), 0.0))
+        segments = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        means = np.add.reduceat(row_distances, segments) / counts
+        order = np.argsort(means)[:k]
+        return candidates[order], means[order]
@@ -0,0 +1,201 @@
+"""Pluggable nearest-neighbour indexes over the face gallery"""
+import numpy as np
+
+ENCODING_DIM = 128
+DEFAULT_CHUNK_SIZE = 16384
+
+
+def squared_norms(matrix):
+    """Return the squared L2 norm of every row of matrix"""
+    return np.einsum('ij,ij->i', matrix, matrix)
+
+
+def _empty_result(n_queries):
+    return (np.empty((n_queries, 0), dtype=np.int64),
+            np.empty((n_queries, 0), dtype=np.float32))
+
+
+def exact_search(matrix, sq_norms, queries, k=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Find the k nearest gallery rows for every query.
+
+    Distances are Euclidean, the same metric face_recognition uses, computed
+    as ||q||^2 + ||g||^2 - 2 q.g over gallery chunks of chunk_size rows so
+    that very large galleries never materialize a full distance matrix.
+    Returns (indices, distances), both shaped (n_queries, k) and sorted by
+    ascending distance.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    n_queries = queries.shape[0]
+    n_rows = matrix.shape[0]
+    k = min(k, n_rows)
+    if n_queries == 0 or k <= 0:
+        return _empty_result(n_queries)
+
+    query_norms = squared_norms(queries)
+    best_idx = np.empty((n_queries, 0), dtype=np.int64)
+    best_d2 = np.empty((n_queries, 0), dtype=np.float32)
+
+    for start in range(0, n_rows, chunk_size):
+        block = matrix[start:start + chunk_size]
+        d2 = query_norms[:, None] + sq_norms[start:start + block.shape[0]][None, :]
+        d2 -= 2.0 * (queries @ block.T)
+
+        # Keep only the k closest rows of this chunk before merging
+        if k < block.shape[0]:
+            part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            part_d2 = np.take_along_axis(d2, part, axis=1)
+        else:
+            part = np.broadcast_to(np.arange(block.shape[0]), d2.shape)
+            part_d2 = d2
+
+        best_idx = np.concatenate([best_idx, part + start], axis=1)
+        best_d2 = np.concatenate([best_d2, part_d2], axis=1)
+        if best_idx.shape[1] > k:
+            keep = np.argpartition(best_d2, k - 1, axis=1)[:, :k]
+            best_idx = np.take_along_axis(best_idx, keep, axis=1)
+            best_d2 = np.take_along_axis(best_d2, keep, axis=1)
+
+    order = np.argsort(best_d2, axis=1)
+    best_idx = np.take_along_axis(best_idx, order, axis=1)
+    best_d2 = np.take_along_axis(best_d2, order, axis=1)
+    return best_idx, np.sqrt(np.maximum(best_d2, 0.0))
+
+
+class BruteForceIndex:
+    """Exact linear scan; the reference every other index is measured against"""
+    name = 'brute'
+    # build() only keeps references, so rebuilding after every gallery change is free
+    cheap_build = True
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.matrix = None
+        self.sq_norms = None
+
+    def clone(self):
+        """Return an unbuilt index with the same settings"""
+        return BruteForceIndex(self.chunk_size)
+
+    def build(self, matrix, sq_norms):
+        """Index the gallery matrix"""
+        self.matrix = matrix
+        self.sq_norms = sq_norms
+
+    def search(self, queries, k=1):
+        """Return (indices, distances) of the k nearest rows per query"""
+        return exact_search(self.matrix, self.sq_norms, queries, k, self.chunk_size)
+
+
+class IVFIndex:
+    """Inverted-file index partitioned by k-means.
+
+    Rows are grouped into n_lists clusters and stored contiguously per
+    cluster. A query only scans the n_probe clusters whose centroids are
+    closest, so n_probe is the recall/latency knob: n_probe == n_lists is
+    an exact search. Galleries smaller than min_rows fall back to a linear
+    scan since partitioning does not pay off there.
+    """
+    name = 'ivf'
+    cheap_build = False
+
+    def __init__(self, n_lists=None, n_probe=8, kmeans_iters=10, train_size=65536,
+                 min_rows=4096, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.kmeans_iters = kmeans_iters
+        self.train_size = train_size
+        self.min_rows = min_rows
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.centroids = None
+        self.brute = BruteForceIndex(chunk_size)
+
+    def clone(self):
+        """Return an unbuilt index with the same settings"""
+        return IVFIndex(self.n_lists, self.n_probe, self.kmeans_iters, self.train_size,
+                        self.min_rows, self.seed, self.chunk_size)
+
+    def build(self, matrix, sq_norms):
+        """Train centroids and bucket every gallery row"""
+        self.brute.build(matrix, sq_norms)
+        n_rows = matrix.shape[0]
+        if n_rows < self.min_rows:
+            self.centroids = None
+            return
+
+        n_lists = self.n_lists or int(np.sqrt(n_rows))
+        n_lists = max(1, min(n_lists, n_rows))
+        self.centroids = self._train(matrix, n_lists)
+        self.centroid_norms = squared_norms(self.centroids)
+
+        assignments = self._assign(matrix)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.row_ids = order
+        self.list_matrix = np.ascontiguousarray(matrix[order])
+        self.list_norms = sq_norms[order]
+
+    def _assign(self, matrix):
+        indices, _ = exact_search(self.centroids, squared_norms(self.centroids),
+                                  matrix, 1, self.chunk_size)
+        return indices[:, 0]
+
+    def _train(self, matrix, n_lists):
+        """Run Lloyd's k-means on a sample of the gallery"""
+        rng = np.random.default_rng(self.seed)
+        n_rows = matrix.shape[0]
+        sample_size = min(n_rows, max(self.train_size, n_lists))
+        sample = matrix[rng.choice(n_rows, sample_size, replace=False)]
+        self.centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assignments = self._assign(sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, sample)
+            filled = counts > 0
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty clusters with random sample rows
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                self.centroids[empty] = sample[rng.choice(sample_size, len(empty))]
+        return self.centroids
+
+    def search(self, queries, k=1):
+        """Return (indices, distances) of the approximate k nearest rows per query"""
+        if self.centroids is None:
+            return self.brute.search(queries, k)
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(self.n_probe, self.centroids.shape[0])
+        probes, _ = exact_search(self.centroids, self.centroid_norms, queries,
+                                 n_probe, self.chunk_size)
+
+        k = min(k, self.list_matrix.shape[0])
+        indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        distances = np.full((queries.shape[0], k), np.inf, dtype=np.float32)
+        for i, query_probes in enumerate(probes):
+            rows = np.concatenate([np.arange(self.offsets[p], self.offsets[p + 1])
+                                   for p in query_probes])
+            found, found_d = exact_search(self.list_matrix[rows], self.list_norms[rows],
+                                          queries[i], k, self.chunk_size)
+            n_found = found.shape[1]
+            indices[i, :n_found] = self.row_ids[rows[found[0]]]
+            distances[i, :n_found] = found_d[0]
+        return indices, distances
+
+
+INDEX_BACKENDS = {
+    BruteForceIndex.name: BruteForceIndex,
+    IVFIndex.name: IVFIndex,
+}
+
+
+def create_index(name='brute', **options):
+    """Create a gallery index by backend name"""
+    try:
+        index_class = INDEX_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown gallery index '{name}', expected one of {sorted(INDEX_BACKENDS)}")
+    return index_class(**options)
@@ -0,0 +1,100 @@
+"""Process-wide face gallery shared by every window and worker"""
+import threading
+from core.face_recognition import FaceRecognizer
+
+
+class GalleryService:
+    """Lazily loads one FaceRecognizer and hands the same instance to every caller.
+
+    Nothing touches the database until recognizer() is first called, so
+    windows that never recognize anyone (history, registration) cost no
+    gallery load. The first caller loads the gallery; concurrent callers
+    wait for that load instead of starting their own. Readers need no
+    locking: a reload builds a new gallery and publishes it with a single
+    assignment (see FaceRecognizer._swap_gallery).
+
+    Subscribers are called with the recognizer after every reload or user
+    change, on the thread that made it.
+    """
+
+    def __init__(self, **recognizer_options):
+        self.recognizer_options = recognizer_options
+        self._recognizer = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def configure(self, **recognizer_options):
+        """Set FaceRecognizer options; only possible before the gallery is loaded"""
+        with self._lock:
+            if self._recognizer is not None:
+                raise RuntimeError("Gallery already loaded; configure it before first use")
+            self.recognizer_options = recognizer_options
+
+    def is_loaded(self):
+        return self._recognizer is not None
+
+    def recognizer(self):
+        """Return the shared recognizer, loading the gallery on first use"""
+        recognizer = self._recognizer
+        if recognizer is not None:
+            return recognizer
+        with self._lock:
+            if self._recognizer is None:
+                self._recognizer = FaceRecognizer(**self.recognizer_options)
+            return self._recognizer
+
+    def reload(self):
+        """Re-read the gallery after registrations changed it and notify subscribers.
+
+        A gallery nobody has loaded yet is left alone; its first load
+        reads the current state anyway.
+        """
+        with self._lock:
+            recognizer = self._recognizer
+            if recognizer is None:
+                return
+            recognizer.refresh_database()
+            subscribers = list(self._subscribers)
+        self._notify(recognizer, subscribers)
+
+    def update_user(self, user, encodings):
+        """Add or replace one user's templates in the loaded gallery and notify subscribers.
+
+        Costs a few row copies instead of a full reload; a gallery nobody
+        has loaded yet is left alone.
+        """
+        self._apply(lambda recognizer: recognizer.update_user(user, encodings))
+
+    def remove_user(self, user_id):
+        """Drop one user from the loaded gallery and notify subscribers"""
+        self._apply(lambda recognizer: recognizer.remove_user(user_id))
+
+    def _apply(self, change):
+        with self._lock:
+            recognizer = self._recognizer
+            if recognizer is None:
+                return
+            change(recognizer)
+            subscribers = list(self._subscribers)
+        self._notify(recognizer, subscribers)
+
+    def _notify(self, recognizer, subscribers):
+        for callback in subscribers:
+            try:
+                callback(recognizer)
+            except Exception as e:
+                print(f"Error notifying gallery subscriber: {e}")
+
+    def subscribe(self, callback):
+        """Call callback(recognizer) whenever the gallery changes"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+
+# Shared by the GUI windows and, per process, by recognition workers
+gallery_service = GalleryService()
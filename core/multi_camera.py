@@ -0,0 +1,267 @@
+"""Headless multi-camera attendance pipeline backed by a process pool"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import cv2
+from core.face_recognition import downscale_frame, FRAME_SCALE
+from core.gallery_service import gallery_service
+from core.embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache
+from utils.profiles import get_profile
+from utils.metrics import metrics
+
+# Recognizer owned by each pool worker process, created once by _init_worker
+_worker_recognizer = None
+
+
+def _init_worker(recognizer_options):
+    """Load the gallery once per worker process.
+
+    With the embedding cache enabled every worker maps the same snapshot
+    file, so the gallery pages are shared between processes. The parent
+    has already synced it, so workers only read it.
+    """
+    global _worker_recognizer
+    gallery_service.configure(**dict(recognizer_options, sync_cache=False))
+    _worker_recognizer = gallery_service.recognizer()
+
+
+def _recognize(rgb_small_frame, tolerance):
+    """Recognize a prepared frame in a worker; return (matches, seconds spent)"""
+    start = time.perf_counter()
+    matches = []
+    for result in _worker_recognizer.recognize_prepared(rgb_small_frame, tolerance):
+        if result['match'] is not None:
+            match = dict(result['match'])
+            match['location'] = result['location']
+            matches.append(match)
+    return matches, time.perf_counter() - start
+
+
+class CameraStats:
+    """Rolling per-camera throughput and latency figures"""
+
+    def __init__(self, window=200):
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.recognitions = 0
+        self.latencies = deque(maxlen=window)
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self.frames_processed += 1
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        """Return processed FPS and latency percentiles in milliseconds"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            summary = {
+                'frames_read': self.frames_read,
+                'frames_processed': self.frames_processed,
+                'frames_dropped': self.frames_dropped,
+                'recognitions': self.recognitions,
+                'fps': self.frames_processed / elapsed,
+            }
+        if latencies:
+            summary['latency_ms_p50'] = 1000.0 * latencies[len(latencies) // 2]
+            summary['latency_ms_p95'] = 1000.0 * latencies[min(len(latencies) - 1,
+                                                               int(len(latencies) * 0.95))]
+        return summary
+
+
+class CameraSource:
+    """Feeds one camera or video file into the shared recognition pool.
+
+    Live cameras drop frames while max_in_flight recognitions are pending,
+    so latency stays bounded. Video files block instead, so every sampled
+    frame is processed and runs are reproducible.
+    """
+
+    def __init__(self, name, source, pool, on_matches, tolerance=0.6, fps=None,
+                 max_in_flight=2, frame_scale=FRAME_SCALE):
+        self.name = name
+        self.source = source
+        self.is_file = isinstance(source, str) and not source.isdigit()
+        self.pool = pool
+        self.on_matches = on_matches
+        self.tolerance = tolerance
+        self.fps = fps
+        # Must match the workers' speed profile, which detects on these frames
+        self.frame_scale = frame_scale
+        self.stats = CameraStats()
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f'camera-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        capture = cv2.VideoCapture(self.source if self.is_file else int(self.source))
+        if not capture.isOpened():
+            print(f"[{self.name}] Could not open source {self.source}")
+            return
+
+        # Sample video files at the requested rate using their own timeline
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        step = max(1, round(source_fps / self.fps)) if self.is_file and self.fps else 1
+        interval = 1.0 / self.fps if self.fps and not self.is_file else 0.0
+        next_frame_time = time.monotonic()
+        index = -1
+        try:
+            while self._running:
+                ret, frame = capture.read()
+                if not ret:
+                    if self.is_file:
+                        break
+                    time.sleep(0.01)
+                    continue
+                index += 1
+                self.stats.frames_read += 1
+                if index % step:
+                    continue
+                if interval:
+                    now = time.monotonic()
+                    if now < next_frame_time:
+                        continue
+                    next_frame_time = now + interval
+
+                if not self._slots.acquire(blocking=self.is_file):
+                    self.stats.frames_dropped += 1
+                    metrics.counter('frames_dropped').inc()
+                    continue
+                captured = time.monotonic()
+                try:
+                    future = self.pool.submit(_recognize, downscale_frame(frame, self.frame_scale),
+                                              self.tolerance)
+                except (BrokenProcessPool, RuntimeError) as e:
+                    # A worker died or the pool was shut down; nothing will run
+                    # this frame, and the slot must be free for the final drain
+                    self._slots.release()
+                    print(f"[{self.name}] Recognition pool unavailable, stopping: {e}")
+                    break
+                future.add_done_callback(
+                    lambda f, captured=captured: self._on_done(f, captured))
+        finally:
+            capture.release()
+            # Wait for in-flight frames so file runs report complete numbers
+            for _ in range(self.max_in_flight):
+                self._slots.acquire()
+
+    def _on_done(self, future, captured):
+        self._slots.release()
+        try:
+            matches, seconds = future.result()
+        except Exception as e:
+            print(f"[{self.name}] Recognition failed: {e}")
+            return
+        latency = time.monotonic() - captured
+        self.stats.record(latency)
+        # Stage timings inside worker processes are not visible here, so
+        # record the worker-reported recognition time and end-to-end latency
+        metrics.counter('frames_processed').inc()
+        metrics.observe('recognize', seconds)
+        metrics.observe('camera_latency', latency)
+        if matches:
+            self.stats.recognitions += len(matches)
+            self.on_matches(self.name, matches)
+
+
+class MultiCameraDaemon:
+    """Runs several camera sources against one process pool of recognizers"""
+
+    def __init__(self, cameras, attendance_tracker, workers=None, tolerance=0.6,
+                 recognizer_options=None):
+        self.attendance_tracker = attendance_tracker
+
+        # Bring the shared embedding cache up to date once, before the
+        # workers map it, so they never race to rewrite it
+        cache_dir = (recognizer_options or {}).get('cache_dir', DEFAULT_CACHE_DIR)
+        if cache_dir:
+            EmbeddingCache(cache_dir).sync(attendance_tracker.db_queries)
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            # Camera threads are already running when workers start; spawn
+            # avoids forking a process that holds locks in other threads
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(recognizer_options or {},)
+        )
+        frame_scale = get_profile((recognizer_options or {}).get('profile')).frame_scale
+        self.sources = [
+            CameraSource(camera['name'], camera['source'], self.pool, self.on_matches,
+                         tolerance=tolerance, fps=camera.get('fps'),
+                         max_in_flight=camera.get('max_in_flight', 2), frame_scale=frame_scale)
+            for camera in cameras
+        ]
+
+    def on_matches(self, camera_name, matches):
+        """Mark attendance for recognized users not yet marked this session"""
+        for match in matches:
+            # The tracker's cooldown cache drops repeats without a DB round trip
+            record = self.attendance_tracker.mark_attendance_async(
+                match['user_id'], match['name'], match['role'],
+                match.get('branch'), match.get('designation')
+            )
+            if record is not None:
+                print(f"[{camera_name}] Recognized {match['name']} ({match['user_id']}) "
+                      f"distance {match['distance']:.3f}")
+
+    def report(self):
+        """Return per-camera stats"""
+        return {source.name: source.stats.snapshot() for source in self.sources}
+
+    def run(self, report_interval=10.0):
+        """Run until every source ends (video files) or KeyboardInterrupt"""
+        for source in self.sources:
+            source.start()
+        try:
+            last_report = time.monotonic()
+            while any(source.is_alive() for source in self.sources):
+                time.sleep(0.2)
+                if report_interval and time.monotonic() - last_report >= report_interval:
+                    last_report = time.monotonic()
+                    print_report(self.report())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for source in self.sources:
+                source.stop()
+            for source in self.sources:
+                source.join(timeout=5.0)
+            self.pool.shutdown(wait=True)
+            self.attendance_tracker.close()
+        return self.report()
+
+
+def print_report(report):
+    """Print one line of stats per camera"""
+    for name, stats in report.items():
+        latency = ''
+        if 'latency_ms_p50' in stats:
+            latency = (f" latency p50 {stats['latency_ms_p50']:.0f}ms"
+                       f" p95 {stats['latency_ms_p95']:.0f}ms")
+        print(f"[{name}] {stats['fps']:.1f} fps, {stats['frames_processed']} processed, "
+              f"{stats['frames_dropped']} dropped, {stats['recognitions']} recognitions{latency}")
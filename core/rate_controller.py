@@ -0,0 +1,111 @@
+"""Adaptive recognition rate driven by measured per-frame cost"""
+import os
+import time
+from utils.metrics import metrics
+
+DEFAULT_CPU_BUDGET = 0.5
+
+
+class RateController:
+    """Decides how long to wait between recognitions.
+
+    The cost of recent recognitions is tracked as an exponential moving
+    average. cpu_budget is the share of one core recognition may use:
+    with 0.5, a 40 ms recognition runs at most every 80 ms. target_latency
+    is how old results may get while faces are in view: the interval
+    stretches to target_latency - cost to save CPU, but no further. Given
+    both, the CPU budget wins. Given neither, recognition runs back to back.
+
+    After idle_after seconds without a face, the interval grows by backoff
+    per recognition up to idle_interval, and returns to the active rate as
+    soon as a face is seen. A face entering an idle scene is picked up
+    within idle_interval.
+
+    Decisions are reported under name as gauges (<name>_interval_seconds,
+    <name>_cost_seconds, <name>_idle) and counters (<name>_idle_backoffs,
+    <name>_wakeups, <name>_target_missed).
+    """
+
+    def __init__(self, cpu_budget=DEFAULT_CPU_BUDGET, target_latency=None, min_interval=0.0,
+                 idle_interval=0.5, idle_after=2.0, backoff=1.5, smoothing=0.2,
+                 name='recognition', clock=time.monotonic):
+        if cpu_budget is not None and not 0.0 < cpu_budget <= 1.0:
+            raise ValueError(f"cpu_budget must be in (0, 1], got {cpu_budget}")
+        self.cpu_budget = cpu_budget
+        self.target_latency = target_latency
+        self.min_interval = min_interval
+        self.idle_interval = idle_interval
+        self.idle_after = idle_after
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.name = name
+        self.clock = clock
+        self.cost = None
+        self.interval = min_interval
+        self.idle = False
+        self.last_face_time = clock()
+        self.next_due = 0.0
+
+    def delay(self):
+        """Seconds until the next recognition is due; zero or less means now"""
+        return self.next_due - self.clock()
+
+    def active_interval(self):
+        """Interval while faces are in view, from the current cost estimate"""
+        cost = self.cost or 0.0
+        interval = self.min_interval
+        if self.target_latency is not None:
+            interval = max(interval, self.target_latency - cost)
+        if self.cpu_budget is not None:
+            interval = max(interval, cost / self.cpu_budget)
+        return interval
+
+    def record(self, cost, faces):
+        """Account for one recognition that took cost seconds and found faces; return the next interval"""
+        now = self.clock()
+        self.cost = cost if self.cost is None else (
+            self.smoothing * cost + (1.0 - self.smoothing) * self.cost)
+        if self.target_latency is not None and cost > self.target_latency:
+            metrics.counter(f'{self.name}_target_missed').inc()
+
+        active = self.active_interval()
+        if faces:
+            self.last_face_time = now
+            if self.idle:
+                self.idle = False
+                metrics.counter(f'{self.name}_wakeups').inc()
+            self.interval = active
+        elif now - self.last_face_time >= self.idle_after:
+            if not self.idle:
+                self.idle = True
+                metrics.counter(f'{self.name}_idle_backoffs').inc()
+            # Never faster than the active rate, even on a slow machine
+            self.interval = max(active, min(max(self.interval, 0.01) * self.backoff,
+                                            self.idle_interval))
+        else:
+            self.interval = active
+
+        # The interval runs from the start of the recognition just finished
+        self.next_due = now - cost + self.interval
+        metrics.gauge(f'{self.name}_interval_seconds').set(self.interval)
+        metrics.gauge(f'{self.name}_cost_seconds').set(self.cost)
+        metrics.gauge(f'{self.name}_idle').set(1 if self.idle else 0)
+        return self.interval
+
+
+def rate_controller_from_env(**options):
+    """Create a RateController configured by FACE_ATTENDANCE_CPU_BUDGET and
+    FACE_ATTENDANCE_TARGET_LATENCY_MS; options override both.
+
+    Setting only a target latency drops the default CPU budget.
+    """
+    budget = os.environ.get('FACE_ATTENDANCE_CPU_BUDGET')
+    latency_ms = os.environ.get('FACE_ATTENDANCE_TARGET_LATENCY_MS')
+    settings = {}
+    if latency_ms:
+        settings['target_latency'] = float(latency_ms) / 1000.0
+        settings['cpu_budget'] = None
+    if budget:
+        settings['cpu_budget'] = float(budget)
+    settings.update(options)
+    return RateController(**settings)
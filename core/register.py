@@ -1,49 +1,76 @@
 """Registration module for face attendance system"""
 import cv2
 import face_recognition
-from utils.encoder import encode_face, encode_to_bytes
-from database.db_queries import DatabaseQueries
+from utils.encoder import bytes_to_encode, encode_face_with_count, encode_to_bytes
+from database.storage import create_queries
+from core.templates import MAX_TEMPLATES, group_templates, representative, select_diverse
 
 class Registration:
-    def __init__(self):
-        self.db_queries = DatabaseQueries()
+    def __init__(self, max_templates=MAX_TEMPLATES, gallery_service=None, profile=None):
+        self.db_queries = create_queries()
+        self.max_templates = max_templates
+        # Speed profile for enrollment encodings, see utils.profiles
+        self.profile = profile
+        # Loaded galleries get the new templates in place of a full reload
+        self.gallery_service = gallery_service
     
     def capture_and_register(self, frame, user_id, name, role, branch=None, designation=None):
         """Capture face from frame and register user"""
-        try:
+        return self.register_burst([frame], user_id, name, role, branch, designation)
+    
+    def encode_burst(self, frames):
+        """Encode every frame of a burst showing exactly one face"""
+        encodings = []
+        for frame in frames:
             # Convert BGR to RGB if needed
             if len(frame.shape) == 3:
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             else:
                 rgb_frame = frame
-            
-            # Encode face
-            face_encoding = encode_face(rgb_frame)
-            
-            if face_encoding is None:
+            face_encoding, face_count = encode_face_with_count(rgb_frame, self.profile)
+            # A second face could be enrolled under this user by mistake
+            if face_encoding is not None and face_count == 1:
+                encodings.append(face_encoding)
+        return encodings
+    
+    def register_burst(self, frames, user_id, name, role, branch=None, designation=None):
+        """Register a user from a burst of frames, one template per usable frame.
+        
+        Re-registering an existing user adds the new templates to the ones
+        already stored; when there are more than max_templates the most
+        diverse are kept.
+        """
+        try:
+            encodings = self.encode_burst(frames)
+            if not encodings:
                 return False, "No face detected in the image"
             
-            # Convert to bytes
-            face_encoding_bytes = encode_to_bytes(face_encoding)
-            
             # Check if user already exists
             existing_user = self.db_queries.get_user_by_id(user_id)
             if existing_user:
-                # Update existing user
-                success = self.db_queries.update_face_encoding(user_id, face_encoding_bytes)
-                if success:
-                    return True, "Face updated successfully"
-                else:
-                    return False, "Failed to update face encoding"
-            else:
-                # Add new user
-                success = self.db_queries.add_user(
-                    user_id, name, role, branch, designation, face_encoding_bytes
-                )
-                if success:
-                    return True, "Registration successful"
-                else:
-                    return False, "Failed to register user"
+                existing = group_templates(self.db_queries.get_face_templates([user_id]))
+                previous = existing.get(user_id)
+                if not previous and existing_user.get('face_encoding') is not None:
+                    # Enrolled before templates existed
+                    previous = [bytes_to_encode(existing_user['face_encoding'])]
+                encodings = [e for e in previous or [] if e is not None] + encodings
+            elif not self.db_queries.add_user(user_id, name, role, branch, designation):
+                return False, "Failed to register user"
+            
+            encodings = [encodings[i] for i in select_diverse(encodings, self.max_templates)]
+            success = self.db_queries.replace_face_templates(
+                user_id, [encode_to_bytes(encoding) for encoding in encodings],
+                encode_to_bytes(representative(encodings))
+            )
+            if not success:
+                return False, "Failed to save face templates"
+            if self.gallery_service is not None:
+                user = existing_user or {'user_id': user_id, 'name': name, 'role': role,
+                                         'branch': branch, 'designation': designation}
+                self.gallery_service.update_user(user, encodings)
+            if existing_user:
+                return True, f"Face updated successfully ({len(encodings)} templates)"
+            return True, f"Registration successful ({len(encodings)} templates)"
         except Exception as e:
             return False, f"Error during registration: {str(e)}"
     
@@ -0,0 +1,46 @@
+"""Multiple face templates per enrolled user"""
+import numpy as np
+from core.gallery_index import ENCODING_DIM
+from utils.encoder import bytes_to_encode
+
+# Templates kept per user; bounds the gallery at MAX_TEMPLATES rows per person
+MAX_TEMPLATES = 5
+
+
+def select_diverse(encodings, max_templates=MAX_TEMPLATES):
+    """Return the indices of at most max_templates mutually distant encodings.
+
+    Greedy farthest-point selection: start from the encoding closest to the
+    mean (the most typical capture), then repeatedly add the encoding
+    farthest from everything already kept. Near-duplicate frames of the
+    same pose and lighting are dropped first, so the kept set covers the
+    widest range of conditions.
+    """
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    count = encodings.shape[0]
+    if count <= max_templates:
+        return list(range(count))
+
+    mean = encodings.mean(axis=0)
+    selected = [int(np.argmin(np.linalg.norm(encodings - mean, axis=1)))]
+    nearest = np.linalg.norm(encodings - encodings[selected[0]], axis=1)
+    while len(selected) < max_templates:
+        index = int(np.argmax(nearest))
+        selected.append(index)
+        nearest = np.minimum(nearest, np.linalg.norm(encodings - encodings[index], axis=1))
+    return sorted(selected)
+
+
+def representative(encodings):
+    """Return the mean template, stored in users.face_encoding for single-vector consumers"""
+    return np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM).mean(axis=0)
+
+
+def group_templates(rows):
+    """Decode (user_id, template bytes) rows into {user_id: [encoding, ...]}"""
+    templates = {}
+    for user_id, template in rows or []:
+        encoding = bytes_to_encode(template)
+        if encoding is not None:
+            templates.setdefault(user_id, []).append(encoding)
+    return templates
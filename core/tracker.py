@@ -0,0 +1,211 @@
+"""Detect-once, track-between face tracking"""
+import importlib.util
+import itertools
+import numpy as np
+
+
+def iou(box_a, box_b):
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area_a = (box_a[1] - box_a[3]) * (box_a[2] - box_a[0])
+    area_b = (box_b[1] - box_b[3]) * (box_b[2] - box_b[0])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def centroid_distance(box_a, box_b):
+    """Distance between box centres relative to the size of box_a"""
+    ay, ax = (box_a[0] + box_a[2]) / 2, (box_a[1] + box_a[3]) / 2
+    by, bx = (box_b[0] + box_b[2]) / 2, (box_b[1] + box_b[3]) / 2
+    size = max(box_a[1] - box_a[3], box_a[2] - box_a[0], 1)
+    return np.hypot(ax - bx, ay - by) / size
+
+
+class Track:
+    """One face followed across frames, with its cached identity"""
+
+    def __init__(self, track_id, location):
+        self.track_id = track_id
+        self.location = location
+        self.encoded_location = None
+        self.encoded_age = 0
+        self.encode_count = 0
+        self.encoding = None
+        self.match = None
+        self.candidates = []
+        self.misses = 0
+        self.age = 0
+        self.correlation_tracker = None
+
+    def result(self):
+        """Return the track in the same shape as FaceRecognizer.recognize_faces results"""
+        return {
+            'track_id': self.track_id,
+            'encode_count': self.encode_count,
+            'match': self.match,
+            'candidates': self.candidates,
+            'location': self.location,
+            'encoding': self.encoding
+        }
+
+
+class FaceTracker:
+    """Runs full detection only every detect_every frames and follows faces in between.
+
+    Detections are associated with existing tracks by IoU, falling back to
+    centroid distance for fast movement. A track is encoded and matched
+    when it is created and re-encoded only when its box has moved or
+    resized enough that IoU with the box it was last encoded at drops below
+    reencode_iou, or, when reencode_every is set, after that many detections
+    without an encoding; otherwise its identity is reused. A track still
+    unknown is re-encoded every unknown_reencode_every detections
+    regardless, so a face first seen turned away or blurred is not left
+    unknown for as long as it stands still. Between detections
+    boxes stay put, or follow the face with dlib's correlation tracker when
+    use_correlation is set. Detection also runs on the next frame whenever
+    there are no tracks or a track was missed.
+    """
+
+    def __init__(self, face_recognizer, detect_every=10, iou_threshold=0.3,
+                 max_centroid_distance=0.5, max_misses=3, reencode_iou=0.6,
+                 use_correlation=False, tolerance=0.6, reencode_every=None,
+                 unknown_reencode_every=2):
+        self.face_recognizer = face_recognizer
+        self.detect_every = detect_every
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_misses = max_misses
+        self.reencode_iou = reencode_iou
+        self.reencode_every = reencode_every
+        self.unknown_reencode_every = unknown_reencode_every
+        # dlib is imported only once a correlation tracker is started, so
+        # creating a tracker does not load it
+        self.use_correlation = use_correlation and importlib.util.find_spec('dlib') is not None
+        self.tolerance = tolerance
+        self.tracks = []
+        self._frame_count = 0
+        self._force_detect = True
+        self._next_id = itertools.count(1)
+        self.stats = {'frames': 0, 'detections': 0, 'encodings': 0}
+
+    def reset(self):
+        """Drop all tracks, e.g. after the gallery changed"""
+        self.tracks = []
+        self._force_detect = True
+
+    def update(self, frame):
+        """Process a BGR frame and return one result per tracked face"""
+        self.stats['frames'] += 1
+        self._frame_count += 1
+        rgb_small_frame = self.face_recognizer.prepare_frame(frame)
+
+        if self._force_detect or self._frame_count % self.detect_every == 0:
+            self._detect(rgb_small_frame)
+        elif self.use_correlation:
+            self._follow(rgb_small_frame)
+        return [track.result() for track in self.tracks]
+
+    def _associate(self, detections):
+        """Greedily pair detections with tracks; return (pairs, new detections)"""
+        candidates = []
+        for t, track in enumerate(self.tracks):
+            for d, detection in enumerate(detections):
+                overlap = iou(track.location, detection)
+                if overlap >= self.iou_threshold:
+                    candidates.append((1.0 + overlap, t, d))
+                else:
+                    distance = centroid_distance(track.location, detection)
+                    if distance <= self.max_centroid_distance:
+                        candidates.append((1.0 - distance, t, d))
+        candidates.sort(reverse=True)
+
+        pairs, used_tracks, used_detections = [], set(), set()
+        for _, t, d in candidates:
+            if t in used_tracks or d in used_detections:
+                continue
+            pairs.append((t, d))
+            used_tracks.add(t)
+            used_detections.add(d)
+        unmatched = [d for d in range(len(detections)) if d not in used_detections]
+        return pairs, unmatched
+
+    def _detect(self, rgb_small_frame):
+        self.stats['detections'] += 1
+        detections = self.face_recognizer.detect_faces(rgb_small_frame)
+        pairs, unmatched = self._associate(detections)
+
+        matched_tracks = set()
+        to_encode = []
+        for t, d in pairs:
+            track = self.tracks[t]
+            track.location = detections[d]
+            track.misses = 0
+            track.age += 1
+            matched_tracks.add(t)
+            since_encoded = track.age - track.encoded_age
+            if (track.encoded_location is None
+                    or iou(track.encoded_location, track.location) < self.reencode_iou
+                    or (self.reencode_every and since_encoded >= self.reencode_every)
+                    or (track.match is None and since_encoded >= self.unknown_reencode_every)):
+                to_encode.append(track)
+
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        for d in unmatched:
+            track = Track(next(self._next_id), detections[d])
+            survivors.append(track)
+            to_encode.append(track)
+        self.tracks = survivors
+
+        self._encode(rgb_small_frame, to_encode)
+        if self.use_correlation:
+            for track in self.tracks:
+                if track.misses == 0:
+                    self._start_correlation(rgb_small_frame, track)
+        self._force_detect = not self.tracks or any(track.misses for track in self.tracks)
+
+    def _encode(self, rgb_small_frame, tracks):
+        if not tracks:
+            return
+        locations = [track.location for track in tracks]
+        encodings = self.face_recognizer.encode_faces(rgb_small_frame, locations)
+        self.stats['encodings'] += len(encodings)
+        matches = self.face_recognizer.match_encodings(encodings, self.tolerance) if encodings else []
+        for track, encoding, (best, candidates) in zip(tracks, encodings, matches):
+            track.encoding = encoding
+            track.encoded_location = track.location
+            track.encoded_age = track.age
+            track.encode_count += 1
+            track.match = best
+            track.candidates = candidates
+
+    def _start_correlation(self, rgb_small_frame, track):
+        import dlib
+        scale = self.face_recognizer.frame_scale
+        top, right, bottom, left = (int(value * scale) for value in track.location)
+        track.correlation_tracker = dlib.correlation_tracker()
+        track.correlation_tracker.start_track(rgb_small_frame, dlib.rectangle(left, top, right, bottom))
+
+    def _follow(self, rgb_small_frame):
+        """Move track boxes with their correlation trackers between detections"""
+        for track in self.tracks:
+            if track.correlation_tracker is None:
+                continue
+            confidence = track.correlation_tracker.update(rgb_small_frame)
+            if confidence < 7.0:
+                # Lost the face; let the next frame run full detection
+                self._force_detect = True
+                continue
+            position = track.correlation_tracker.get_position()
+            scale = self.face_recognizer.frame_scale
+            track.location = tuple(int(value / scale) for value in (
+                position.top(), position.right(), position.bottom(), position.left()))
@@ -0,0 +1,57 @@
+"""Headless multi-camera attendance daemon
+
+Usage: python daemon.py daemon_config.json
+"""
+import argparse
+import json
+import sys
+from core.attendance import AttendanceTracker
+from core.multi_camera import MultiCameraDaemon, print_report
+from utils.metrics import metrics
+
+def load_config(path):
+    """Load and validate the daemon config file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    cameras = config.get('cameras', [])
+    if not cameras:
+        raise ValueError("Config must list at least one camera")
+    for index, camera in enumerate(cameras):
+        if 'source' not in camera:
+            raise ValueError(f"Camera {index} has no source")
+        camera.setdefault('name', f"camera-{index}")
+    return config
+
+def main():
+    """Run the daemon until all sources end or it is interrupted"""
+    parser = argparse.ArgumentParser(description="Headless multi-camera attendance daemon")
+    parser.add_argument('config', help='JSON config listing camera sources')
+    parser.add_argument('--workers', type=int, help='recognizer processes (default: CPU count)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='serve Prometheus metrics on this local port')
+    args = parser.parse_args()
+    
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error loading config: {e}")
+        sys.exit(1)
+    
+    metrics_port = args.metrics_port or config.get('metrics_port')
+    if metrics_port:
+        metrics.enable()
+        metrics.start_http_server(metrics_port)
+    
+    daemon = MultiCameraDaemon(
+        config['cameras'],
+        AttendanceTracker(session_minutes=config.get('session_minutes')),
+        workers=args.workers or config.get('workers'),
+        tolerance=config.get('tolerance', 0.6),
+        recognizer_options=config.get('recognizer', {})
+    )
+    report = daemon.run(report_interval=config.get('report_interval', 10.0))
+    print("Final report:")
+    print_report(report)
+
+if __name__ == "__main__":
+    main()
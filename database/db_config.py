@@ -1,24 +1,66 @@
 """Database configuration for Face Attendance System"""
+import os
+import threading
 import mysql.connector
 from mysql.connector import Error
+from database.pool import ConnectionPool
+
+# One pool per process and server; keyed by pid so forked workers never
+# share sockets with their parent
+_pools = {}
+_pools_lock = threading.Lock()
 
 class DatabaseConfig:
     def __init__(self):
-        self.host = 'localhost'
-        self.database = 'face_attendance_db'
-        self.user = 'root'
-        self.password = 'root'  # Change this to your MySQL password
+        # Override with FACE_ATTENDANCE_DB_HOST, _NAME, _USER and _PASSWORD
+        self.host = os.environ.get('FACE_ATTENDANCE_DB_HOST', 'localhost')
+        self.database = os.environ.get('FACE_ATTENDANCE_DB_NAME', 'face_attendance_db')
+        self.user = os.environ.get('FACE_ATTENDANCE_DB_USER', 'root')
+        # Change the default to your MySQL password, or set the variable
+        self.password = os.environ.get('FACE_ATTENDANCE_DB_PASSWORD', 'root')
         
+        # Connection pool settings
+        self.pool_size = 5
+        self.pool_timeout = 5.0  # Seconds to wait for a free connection
+        self.pool_health_check = True
+        self.pool_health_check_interval = 30.0  # Ping connections idle longer than this
+    
+    def _connect(self):
+        return mysql.connector.connect(
+            host=self.host,
+            database=self.database,
+            user=self.user,
+            password=self.password
+        )
+    
+    def get_pool(self):
+        """Return the process-wide connection pool for this database"""
+        key = (os.getpid(), self.host, self.database, self.user)
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    self._connect,
+                    size=self.pool_size,
+                    timeout=self.pool_timeout,
+                    health_check=self.pool_health_check,
+                    health_check_interval=self.pool_health_check_interval
+                )
+                _pools[key] = pool
+            return pool
+    
+    def connection(self):
+        """Context manager checking a pooled connection out and back in"""
+        return self.get_pool().connection()
+    
+    def pool_stats(self):
+        """Return usage counters of the connection pool"""
+        return self.get_pool().stats()
+    
     def get_connection(self):
-        """Create and return database connection"""
+        """Create and return a dedicated, unpooled database connection"""
         try:
-            connection = mysql.connector.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
-            return connection
+            return self._connect()
         except Error as e:
             print(f"Error connecting to MySQL: {e}")
             return None
@@ -54,7 +96,24 @@ class DatabaseConfig:
                         branch VARCHAR(100),
                         designation VARCHAR(100),
                         face_encoding BLOB,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                            ON UPDATE CURRENT_TIMESTAMP,
+                        INDEX idx_users_updated_at (updated_at),
+                        INDEX idx_users_role_branch (role, branch)
+                    )
+                """)
+                self.migrate_users_table(cursor)
+                
+                # Create face templates table; several encodings per user
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS face_templates (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        user_id VARCHAR(50) NOT NULL,
+                        encoding BLOB NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        INDEX idx_face_templates_user (user_id, id),
+                        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
                     )
                 """)
                 
@@ -69,10 +128,16 @@ class DatabaseConfig:
                         designation VARCHAR(100),
                         date DATE NOT NULL,
                         time TIME NOT NULL,
+                        session VARCHAR(32) NOT NULL DEFAULT '',
                         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE KEY uq_attendance_user_session (user_id, date, session),
+                        INDEX idx_attendance_date (date, timestamp),
+                        INDEX idx_attendance_user_timestamp (user_id, timestamp),
                         FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
                     )
                 """)
+                self.migrate_attendance_table(cursor)
+                self.create_summary_tables(cursor)
                 
                 connection.commit()
                 cursor.close()
@@ -82,4 +147,110 @@ class DatabaseConfig:
         except Error as e:
             print(f"Error initializing database: {e}")
             return False
+    
+    def migrate_users_table(self, cursor):
+        """Add the updated_at watermark column to users tables created before it existed"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'users' AND COLUMN_NAME = 'updated_at'
+        """, (self.database,))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                ALTER TABLE users
+                ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    ON UPDATE CURRENT_TIMESTAMP,
+                ADD INDEX idx_users_updated_at (updated_at)
+            """)
+        self.ensure_index(cursor, 'users', 'idx_users_role_branch', '(role, branch)')
+    
+    def ensure_index(self, cursor, table, name, columns):
+        """Add an index to a table created before the index existed"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """, (self.database, table, name))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} {columns}")
+    
+    def migrate_attendance_table(self, cursor):
+        """Add the session column and one-mark-per-session unique key to older attendance tables"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'attendance' AND COLUMN_NAME = 'session'
+        """, (self.database,))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                ALTER TABLE attendance
+                ADD COLUMN session VARCHAR(32) NOT NULL DEFAULT '' AFTER time
+            """)
+            # Existing rows may hold duplicates; give each its own session so
+            # the unique key can be added without deleting history
+            cursor.execute("UPDATE attendance SET session = CONCAT('legacy-', id)")
+            cursor.execute("""
+                ALTER TABLE attendance
+                ADD UNIQUE KEY uq_attendance_user_session (user_id, date, session)
+            """)
+        self.ensure_index(cursor, 'attendance', 'idx_attendance_date', '(date, timestamp)')
+        self.ensure_index(cursor, 'attendance', 'idx_attendance_user_timestamp',
+                          '(user_id, timestamp)')
+    
+    def create_summary_tables(self, cursor):
+        """Create the reporting summary tables and the trigger that keeps them current.
+        
+        attendance_daily has one row per user per day present,
+        attendance_monthly counts user-days per role and branch, and
+        attendance_calendar counts users present per day (the days the
+        institution was open). The trigger only sees rows actually
+        inserted, so ignored duplicates are not counted. Deletes are not
+        tracked; rebuild the summaries after removing attendance or users.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_daily (
+                user_id VARCHAR(50) NOT NULL,
+                date DATE NOT NULL,
+                role ENUM('student', 'teacher') NOT NULL,
+                branch VARCHAR(100) NOT NULL DEFAULT '',
+                sessions INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, date),
+                INDEX idx_attendance_daily_date (date, role, branch)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_monthly (
+                month DATE NOT NULL,
+                role ENUM('student', 'teacher') NOT NULL,
+                branch VARCHAR(100) NOT NULL DEFAULT '',
+                user_days INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, role, branch)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_calendar (
+                date DATE PRIMARY KEY,
+                users INT NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TRIGGERS
+            WHERE TRIGGER_SCHEMA = %s AND TRIGGER_NAME = 'trg_attendance_summaries'
+        """, (self.database,))
+        if cursor.fetchone()[0] == 0:
+            # ROW_COUNT() is 1 when the daily row was created, 2 when it was updated
+            cursor.execute("""
+                CREATE TRIGGER trg_attendance_summaries AFTER INSERT ON attendance
+                FOR EACH ROW
+                BEGIN
+                    INSERT INTO attendance_daily (user_id, date, role, branch, sessions)
+                    VALUES (NEW.user_id, NEW.date, NEW.role, COALESCE(NEW.branch, ''), 1)
+                    ON DUPLICATE KEY UPDATE sessions = sessions + 1;
+                    IF ROW_COUNT() = 1 THEN
+                        INSERT INTO attendance_monthly (month, role, branch, user_days)
+                        VALUES (DATE_FORMAT(NEW.date, '%Y-%m-01'), NEW.role,
+                                COALESCE(NEW.branch, ''), 1)
+                        ON DUPLICATE KEY UPDATE user_days = user_days + 1;
+                        INSERT INTO attendance_calendar (date, users) VALUES (NEW.date, 1)
+                        ON DUPLICATE KEY UPDATE users = users + 1;
+                    END IF;
+                END
+            """)
 
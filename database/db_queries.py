@@ -1,144 +1,524 @@
 """Database queries for Face Attendance System"""
-import mysql.connector
+import sqlite3
 from datetime import datetime
+from mysql.connector import Error
 from database.db_config import DatabaseConfig
+from utils.metrics import metrics
+
+# Errors raised by either storage backend
+DB_ERRORS = (Error, sqlite3.Error)
+
+ATTENDANCE_COLUMNS = "id, user_id, name, role, branch, designation, date, time, session, timestamp"
+
+def attendance_filters(user_id=None, date=None, role=None):
+    """Build the WHERE clause and parameters for attendance filters"""
+    clauses, params = [], []
+    if user_id:
+        clauses.append("user_id = %s")
+        params.append(user_id)
+    if date:
+        clauses.append("date = %s")
+        params.append(date)
+    if role:
+        clauses.append("role = %s")
+        params.append(role)
+    return clauses, params
 
 class DatabaseQueries:
-    def __init__(self):
-        self.db_config = DatabaseConfig()
+    """Queries against the configured backend; the SQL is MySQL's.
     
+    db_config supplies connections (DatabaseConfig for MySQL, SQLiteConfig
+    for the embedded backend); use database.storage.create_queries() to get
+    the one selected by configuration.
+    """
+    def __init__(self, db_config=None):
+        self.db_config = db_config if db_config is not None else DatabaseConfig()
+    
+    def pool_stats(self):
+        """Return connection pool usage counters for monitoring"""
+        return self.db_config.pool_stats()
+    
+    @metrics.timed('db_add_user')
     def add_user(self, user_id, name, role, branch=None, designation=None, face_encoding=None):
         """Add a new user to the database"""
-        connection = self.db_config.get_connection()
-        if not connection:
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                query = """
+                    INSERT INTO users (user_id, name, role, branch, designation, face_encoding)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """
+                values = (user_id, name, role, branch, designation, face_encoding)
+                cursor.execute(query, values)
+                connection.commit()
+                cursor.close()
+            return True
+        except DB_ERRORS as e:
+            print(f"Error adding user: {e}")
             return False
+    
+    @metrics.timed('db_upsert_users')
+    def upsert_users(self, users):
+        """Insert or update many users in one transaction.
         
+        Each user is a tuple of (user_id, name, role, branch, designation,
+        face_encoding); existing user_ids get their details and encoding replaced.
+        Their face templates are replaced by the new encoding as well, since
+        matching prefers templates over face_encoding.
+        """
         try:
-            cursor = connection.cursor()
-            query = """
-                INSERT INTO users (user_id, name, role, branch, designation, face_encoding)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            values = (user_id, name, role, branch, designation, face_encoding)
-            cursor.execute(query, values)
-            connection.commit()
-            cursor.close()
-            connection.close()
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                query = """
+                    INSERT INTO users (user_id, name, role, branch, designation, face_encoding)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        name = VALUES(name), role = VALUES(role), branch = VALUES(branch),
+                        designation = VALUES(designation), face_encoding = VALUES(face_encoding)
+                """
+                cursor.executemany(query, users)
+                self._replace_single_templates(cursor, users)
+                connection.commit()
+                cursor.close()
             return True
-        except Error as e:
-            print(f"Error adding user: {e}")
-            if connection:
-                connection.close()
+        except DB_ERRORS as e:
+            print(f"Error upserting users: {e}")
             return False
     
+    def _replace_single_templates(self, cursor, users):
+        """Make each upserted user's face_encoding their only template, within the caller's transaction"""
+        user_ids = [user[0] for user in users]
+        # Bounded IN lists keep each statement small
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM face_templates WHERE user_id IN ({placeholders})",
+                           tuple(chunk))
+        templates = [(user[0], user[5]) for user in users if user[5] is not None]
+        if templates:
+            cursor.executemany("INSERT INTO face_templates (user_id, encoding) VALUES (%s, %s)",
+                               templates)
+    
+    @metrics.timed('db_update_face_encoding')
     def update_face_encoding(self, user_id, face_encoding):
         """Update face encoding for a user"""
-        connection = self.db_config.get_connection()
-        if not connection:
-            return False
-        
         try:
-            cursor = connection.cursor()
-            query = "UPDATE users SET face_encoding = %s WHERE user_id = %s"
-            cursor.execute(query, (face_encoding, user_id))
-            connection.commit()
-            cursor.close()
-            connection.close()
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                query = "UPDATE users SET face_encoding = %s WHERE user_id = %s"
+                cursor.execute(query, (face_encoding, user_id))
+                connection.commit()
+                cursor.close()
             return True
-        except Error as e:
+        except DB_ERRORS as e:
             print(f"Error updating face encoding: {e}")
-            if connection:
-                connection.close()
             return False
     
+    @metrics.timed('db_get_all_users')
     def get_all_users(self):
         """Get all users with their face encodings"""
-        connection = self.db_config.get_connection()
-        if not connection:
-            return []
-        
         try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE face_encoding IS NOT NULL")
-            users = cursor.fetchall()
-            cursor.close()
-            connection.close()
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute("SELECT * FROM users WHERE face_encoding IS NOT NULL")
+                users = cursor.fetchall()
+                cursor.close()
             return users
-        except Error as e:
+        except DB_ERRORS as e:
             print(f"Error getting users: {e}")
-            if connection:
-                connection.close()
             return []
     
-    def get_user_by_id(self, user_id):
-        """Get user by user_id"""
-        connection = self.db_config.get_connection()
-        if not connection:
+    @metrics.timed('db_get_users_modified_since')
+    def get_users_modified_since(self, watermark=None):
+        """Get users with face encodings changed at or after watermark.
+        
+        Returns None (not an empty list) when the database is unreachable so
+        callers can tell "nothing changed" apart from "could not check".
+        """
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                query = """
+                    SELECT user_id, name, role, branch, designation, face_encoding, updated_at
+                    FROM users WHERE face_encoding IS NOT NULL
+                """
+                if watermark is None:
+                    cursor.execute(query)
+                else:
+                    cursor.execute(query + " AND updated_at >= %s", (watermark,))
+                users = cursor.fetchall()
+                cursor.close()
+            return users
+        except DB_ERRORS as e:
+            print(f"Error getting modified users: {e}")
+            return None
+    
+    @metrics.timed('db_get_enrolled_user_ids')
+    def get_enrolled_user_ids(self):
+        """Get the user_id of every user with a face encoding, without the BLOBs"""
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT user_id FROM users WHERE face_encoding IS NOT NULL")
+                user_ids = [row[0] for row in cursor.fetchall()]
+                cursor.close()
+            return user_ids
+        except DB_ERRORS as e:
+            print(f"Error getting user ids: {e}")
             return None
+    
+    @metrics.timed('db_get_encoding_chunk')
+    def get_encoding_chunk(self, after_id=0, limit=1000):
+        """Get (id, face_encoding) rows with id > after_id, in id order"""
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                query = """
+                    SELECT id, face_encoding FROM users
+                    WHERE id > %s AND face_encoding IS NOT NULL
+                    ORDER BY id LIMIT %s
+                """
+                cursor.execute(query, (after_id, limit))
+                rows = cursor.fetchall()
+                cursor.close()
+            return rows
+        except DB_ERRORS as e:
+            print(f"Error getting face encodings: {e}")
+            return None
+    
+    @metrics.timed('db_update_face_encodings')
+    def update_face_encodings(self, rows):
+        """Rewrite face encodings for (face_encoding, id) rows in one transaction"""
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                query = "UPDATE users SET face_encoding = %s WHERE id = %s"
+                cursor.executemany(query, rows)
+                connection.commit()
+                cursor.close()
+            return True
+        except DB_ERRORS as e:
+            print(f"Error updating face encodings: {e}")
+            return False
+    
+    @metrics.timed('db_get_face_templates')
+    def get_face_templates(self, user_ids=None):
+        """Get (user_id, template) rows for user_ids, or for every user, grouped by user.
         
+        Returns None when the database is unreachable, like
+        get_users_modified_since.
+        """
+        query = "SELECT user_id, encoding FROM face_templates"
         try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE user_id = %s", (user_id,))
-            user = cursor.fetchone()
-            cursor.close()
-            connection.close()
-            return user
-        except Error as e:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                if user_ids is None:
+                    cursor.execute(query + " ORDER BY user_id, id")
+                    rows = cursor.fetchall()
+                else:
+                    rows = []
+                    user_ids = list(user_ids)
+                    # Bounded IN lists keep each statement small
+                    for start in range(0, len(user_ids), 500):
+                        chunk = user_ids[start:start + 500]
+                        placeholders = ", ".join(["%s"] * len(chunk))
+                        cursor.execute(query + f" WHERE user_id IN ({placeholders})"
+                                       " ORDER BY user_id, id", tuple(chunk))
+                        rows.extend(cursor.fetchall())
+                cursor.close()
+            return rows
+        except DB_ERRORS as e:
+            print(f"Error getting face templates: {e}")
+            return None
+    
+    @metrics.timed('db_replace_face_templates')
+    def replace_face_templates(self, user_id, templates, face_encoding):
+        """Replace a user's templates and their representative face_encoding in one transaction.
+        
+        Writing face_encoding moves users.updated_at, which is how the
+        embedding cache notices the new templates.
+        """
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM face_templates WHERE user_id = %s", (user_id,))
+                cursor.executemany(
+                    "INSERT INTO face_templates (user_id, encoding) VALUES (%s, %s)",
+                    [(user_id, template) for template in templates]
+                )
+                cursor.execute("UPDATE users SET face_encoding = %s WHERE user_id = %s",
+                               (face_encoding, user_id))
+                connection.commit()
+                cursor.close()
+            return True
+        except DB_ERRORS as e:
+            print(f"Error replacing face templates: {e}")
+            return False
+    
+    @metrics.timed('db_get_user_by_id')
+    def get_user_by_id(self, user_id):
+        """Get user by user_id"""
+        try:
+            with self.db_config.connection() as connection:
+                query = "SELECT * FROM users WHERE user_id = %s"
+                cursor = connection.prepared(query, dictionary=True)
+                cursor.execute(query, (user_id,))
+                users = cursor.fetchall()
+            return users[0] if users else None
+        except DB_ERRORS as e:
             print(f"Error getting user: {e}")
-            if connection:
-                connection.close()
             return None
     
-    def mark_attendance(self, user_id, name, role, branch=None, designation=None):
-        """Mark attendance for a user"""
-        connection = self.db_config.get_connection()
-        if not connection:
+    @metrics.timed('db_mark_attendance')
+    def mark_attendance(self, user_id, name, role, branch=None, designation=None, session=''):
+        """Mark attendance for a user; a repeat within the same day and session is ignored"""
+        try:
+            with self.db_config.connection() as connection:
+                query = """
+                    INSERT IGNORE INTO attendance
+                        (user_id, name, role, branch, designation, date, time, session)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                cursor = connection.prepared(query)
+                now = datetime.now()
+                values = (user_id, name, role, branch, designation, now.date(), now.time(),
+                          session)
+                cursor.execute(query, values)
+                connection.commit()
+            return True
+        except DB_ERRORS as e:
+            print(f"Error marking attendance: {e}")
             return False
+    
+    @metrics.timed('db_mark_attendance_batch')
+    def mark_attendance_batch(self, records):
+        """Insert many attendance records in one transaction.
         
+        Each record is a dict with user_id, name, role, branch, designation,
+        the timestamp at which attendance was taken and optionally its
+        session. Records for a user already marked that day and session
+        are ignored, so kiosks sharing the database never double-count.
+        """
         try:
-            cursor = connection.cursor()
-            now = datetime.now()
-            query = """
-                INSERT INTO attendance (user_id, name, role, branch, designation, date, time)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            values = (user_id, name, role, branch, designation, now.date(), now.time())
-            cursor.execute(query, values)
-            connection.commit()
-            cursor.close()
-            connection.close()
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                query = """
+                    INSERT IGNORE INTO attendance
+                        (user_id, name, role, branch, designation, date, time, session, timestamp)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                values = [
+                    (r['user_id'], r['name'], r['role'], r.get('branch'), r.get('designation'),
+                     r['timestamp'].date(), r['timestamp'].time(), r.get('session', ''),
+                     r['timestamp'])
+                    for r in records
+                ]
+                cursor.executemany(query, values)
+                connection.commit()
+                cursor.close()
             return True
-        except Error as e:
-            print(f"Error marking attendance: {e}")
-            if connection:
-                connection.close()
+        except DB_ERRORS as e:
+            print(f"Error marking attendance batch: {e}")
             return False
     
-    def get_attendance_history(self, user_id=None, date=None):
-        """Get attendance history, optionally filtered by user_id or date"""
-        connection = self.db_config.get_connection()
-        if not connection:
-            return []
+    @metrics.timed('db_get_attendance_history')
+    def get_attendance_history(self, user_id=None, date=None, role=None, limit=None):
+        """Get attendance history, newest first, optionally filtered by user_id, date and role"""
+        return self.get_attendance_page(user_id, date, role, limit=limit)
+    
+    @metrics.timed('db_get_attendance_page')
+    def get_attendance_page(self, user_id=None, date=None, role=None, after=None, limit=200):
+        """Get one page of attendance history, newest first.
         
+        Pages are keyset-paginated on (timestamp, id): pass the
+        (timestamp, id) of the last row of the previous page as after. The
+        date and user filters are served by idx_attendance_date and
+        idx_attendance_user_timestamp. limit=None returns every row.
+        """
+        clauses, params = attendance_filters(user_id, date, role)
+        if after is not None:
+            clauses.append("(timestamp < %s OR (timestamp = %s AND id < %s))")
+            params.extend((after[0], after[0], after[1]))
+        query = f"SELECT {ATTENDANCE_COLUMNS} FROM attendance"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
         try:
-            cursor = connection.cursor(dictionary=True)
-            if user_id:
-                query = "SELECT * FROM attendance WHERE user_id = %s ORDER BY timestamp DESC"
-                cursor.execute(query, (user_id,))
-            elif date:
-                query = "SELECT * FROM attendance WHERE date = %s ORDER BY timestamp DESC"
-                cursor.execute(query, (date,))
-            else:
-                query = "SELECT * FROM attendance ORDER BY timestamp DESC"
-                cursor.execute(query)
-            
-            records = cursor.fetchall()
-            cursor.close()
-            connection.close()
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, tuple(params))
+                records = cursor.fetchall()
+                cursor.close()
             return records
-        except Error as e:
+        except DB_ERRORS as e:
             print(f"Error getting attendance history: {e}")
-            if connection:
-                connection.close()
             return []
-
+    
+    def iter_attendance(self, date_from=None, date_to=None, role=None, branch=None,
+                        chunk_size=5000):
+        """Stream attendance rows as tuples in ATTENDANCE_COLUMNS order, chunk_size at a time.
+        
+        Rows are read through an unbuffered cursor on a dedicated
+        connection, so memory stays flat however many rows match and no
+        pool connection is held for the length of the export. Unlike the
+        other queries this raises the backend's error (see DB_ERRORS), so a failed
+        export cannot be mistaken for a complete one.
+        """
+        clauses, params = attendance_filters(role=role)
+        if date_from:
+            clauses.append("date >= %s")
+            params.append(date_from)
+        if date_to:
+            clauses.append("date <= %s")
+            params.append(date_to)
+        if branch:
+            clauses.append("branch = %s")
+            params.append(branch)
+        query = f"SELECT {ATTENDANCE_COLUMNS} FROM attendance"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        # Date ranges walk idx_attendance_date in order; otherwise use primary key order
+        query += " ORDER BY date, timestamp" if date_from or date_to else " ORDER BY id"
+        
+        connection = self.db_config.get_connection()
+        if connection is None:
+            raise Error("Could not connect to the database")
+        try:
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(query, tuple(params))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+        finally:
+            try:
+                connection.close()
+            except DB_ERRORS:
+                # Abandoned mid-stream; the unread result dies with the connection
+                pass
+    
+    @metrics.timed('db_get_monthly_summary')
+    def get_monthly_summary(self, month, role=None, branch=None):
+        """Get attendance_monthly rows (role, branch, user_days) for the month starting at month"""
+        clauses, params = ["month = %s"], [month]
+        if role:
+            clauses.append("role = %s")
+            params.append(role)
+        if branch is not None:
+            clauses.append("branch = %s")
+            params.append(branch)
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(
+                    "SELECT role, branch, user_days FROM attendance_monthly WHERE "
+                    + " AND ".join(clauses) + " ORDER BY role, branch",
+                    tuple(params)
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+            return rows
+        except DB_ERRORS as e:
+            print(f"Error getting monthly summary: {e}")
+            return None
+    
+    @metrics.timed('db_count_working_days')
+    def count_working_days(self, start, end):
+        """Count days in [start, end] on which anyone attended"""
+        try:
+            with self.db_config.connection() as connection:
+                query = "SELECT COUNT(*) FROM attendance_calendar WHERE date BETWEEN %s AND %s"
+                cursor = connection.prepared(query)
+                cursor.execute(query, (start, end))
+                (count,) = cursor.fetchall()[0]
+            return count
+        except DB_ERRORS as e:
+            print(f"Error counting working days: {e}")
+            return None
+    
+    @metrics.timed('db_count_present')
+    def count_present(self, start, end, user_id=None, role=None, branch=None):
+        """Count user-days present in [start, end] from attendance_daily"""
+        clauses, params = ["date BETWEEN %s AND %s"], [start, end]
+        if user_id:
+            clauses.append("user_id = %s")
+            params.append(user_id)
+        if role:
+            clauses.append("role = %s")
+            params.append(role)
+        if branch is not None:
+            clauses.append("branch = %s")
+            params.append(branch)
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT COUNT(*) FROM attendance_daily WHERE "
+                               + " AND ".join(clauses), tuple(params))
+                (count,) = cursor.fetchone()
+                cursor.close()
+            return count
+        except DB_ERRORS as e:
+            print(f"Error counting attendance: {e}")
+            return None
+    
+    @metrics.timed('db_count_users')
+    def count_users(self, role=None, branch=None):
+        """Count enrolled users, optionally by role and branch ('' for users without one)"""
+        clauses, params = [], []
+        if role:
+            clauses.append("role = %s")
+            params.append(role)
+        if branch == '':
+            clauses.append("(branch IS NULL OR branch = '')")
+        elif branch is not None:
+            clauses.append("branch = %s")
+            params.append(branch)
+        query = "SELECT COUNT(*) FROM users"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, tuple(params))
+                (count,) = cursor.fetchone()
+                cursor.close()
+            return count
+        except DB_ERRORS as e:
+            print(f"Error counting users: {e}")
+            return None
+    
+    @metrics.timed('db_rebuild_attendance_summaries')
+    def rebuild_attendance_summaries(self):
+        """Recompute every summary table from the attendance table in one transaction"""
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                for table in ('attendance_daily', 'attendance_monthly', 'attendance_calendar'):
+                    cursor.execute(f"DELETE FROM {table}")
+                cursor.execute("""
+                    INSERT INTO attendance_daily (user_id, date, role, branch, sessions)
+                    SELECT user_id, date, MIN(role), COALESCE(MIN(branch), ''), COUNT(*)
+                    FROM attendance GROUP BY user_id, date
+                """)
+                cursor.execute("""
+                    INSERT INTO attendance_monthly (month, role, branch, user_days)
+                    SELECT DATE_FORMAT(date, '%Y-%m-01') AS month, role, branch, COUNT(*)
+                    FROM attendance_daily GROUP BY month, role, branch
+                """)
+                cursor.execute("""
+                    INSERT INTO attendance_calendar (date, users)
+                    SELECT date, COUNT(*) FROM attendance_daily GROUP BY date
+                """)
+                cursor.execute("SELECT COUNT(*) FROM attendance_daily")
+                (user_days,) = cursor.fetchone()
+                connection.commit()
+                cursor.close()
+            return user_days
+        except DB_ERRORS as e:
+            print(f"Error rebuilding attendance summaries: {e}")
+            return None
@@ -0,0 +1,192 @@
+"""Process-wide MySQL connection pool"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from mysql.connector import Error
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
+
+
+class PooledConnection:
+    """A pooled connection; close() hands it back to the pool instead of disconnecting"""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._prepared = {}
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def prepared(self, query, dictionary=False):
+        """Return a server-side prepared cursor for query, reused across checkouts"""
+        key = (query, dictionary)
+        cursor = self._prepared.get(key)
+        if cursor is None:
+            cursor = self._connection.cursor(prepared=True, dictionary=dictionary)
+            self._prepared[key] = cursor
+        return cursor
+
+    def close(self):
+        """Return the connection to its pool"""
+        self._pool.release(self)
+
+    def disconnect(self):
+        """Really close the underlying connection"""
+        self._prepared.clear()
+        try:
+            self._connection.close()
+        except Error:
+            pass
+
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections.
+
+    Connections are created lazily up to size. When all are checked out,
+    acquire() waits up to timeout seconds before raising PoolError. Idle
+    connections older than health_check_interval seconds are pinged on
+    checkout and replaced if the server dropped them. On checkin an open
+    transaction is rolled back, so the next borrower neither inherits
+    uncommitted work nor keeps reading an old REPEATABLE READ snapshot; a
+    connection is discarded when its user saw it fail or the rollback fails.
+    """
+
+    def __init__(self, connect, size=5, timeout=5.0, health_check=True,
+                 health_check_interval=30.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'health_check_failures': 0,
+            'connections_opened': 0,
+            'connections_discarded': 0,
+        }
+
+    def _open(self):
+        connection = PooledConnection(self, self._connect())
+        with self._lock:
+            self._stats['connections_opened'] += 1
+        return connection
+
+    def _is_healthy(self, connection):
+        if not self.health_check:
+            return True
+        if time.monotonic() - connection.last_used < self.health_check_interval:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+            return False
+
+    def acquire(self):
+        """Check out a connection, opening or waiting for one as needed"""
+        start = time.monotonic()
+        waited = False
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._created < self.size
+                    if can_open:
+                        self._created += 1
+                if can_open:
+                    try:
+                        connection = self._open()
+                    except Error:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                else:
+                    waited = True
+                    remaining = self.timeout - (time.monotonic() - start)
+                    try:
+                        connection = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        with self._lock:
+                            self._stats['timeouts'] += 1
+                        raise PoolError(f"No database connection available after {self.timeout}s")
+
+            if not self._is_healthy(connection):
+                self._discard(connection)
+                continue
+
+            wait_seconds = time.monotonic() - start
+            with self._lock:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                self._stats['wait_seconds_total'] += wait_seconds
+                self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], wait_seconds)
+            return connection
+
+    def release(self, connection, broken=False):
+        """Return a checked-out connection to the pool, or drop it if broken"""
+        if not broken and connection.in_transaction:
+            try:
+                connection.rollback()
+            except Error:
+                broken = True
+        if broken:
+            self._discard(connection)
+            return
+        connection.last_used = time.monotonic()
+        self._idle.put(connection)
+
+    def _discard(self, connection):
+        connection.disconnect()
+        with self._lock:
+            self._created -= 1
+            self._stats['connections_discarded'] += 1
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a with block.
+
+        Work not committed inside the block is rolled back when the
+        connection is returned. The connection is discarded instead when the
+        block failed with a connection error or the rollback itself failed.
+        """
+        connection = self.acquire()
+        broken = False
+        try:
+            yield connection
+        except Exception as e:
+            broken = isinstance(e, (InterfaceError, OperationalError))
+            raise
+        finally:
+            self.release(connection, broken)
+
+    def stats(self):
+        """Return a snapshot of pool usage counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['open'] - stats['idle']
+        return stats
+
+    def close_all(self):
+        """Disconnect every idle connection"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(connection)
@@ -0,0 +1,315 @@
+"""Embedded SQLite storage backend for standalone kiosks, tests and benchmarks"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time
+from database.db_queries import DB_ERRORS, DatabaseQueries
+from utils.metrics import metrics
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.expanduser('~'), '.face_attendance', 'attendance.db')
+
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(time, lambda value: value.isoformat())
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('TIME', lambda value: time.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+# Mirrors the MySQL schema in DatabaseConfig.initialize_database, including
+# the indexes and the trigger maintaining the reporting summaries
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        role TEXT NOT NULL CHECK (role IN ('student', 'teacher')),
+        branch TEXT,
+        designation TEXT,
+        face_encoding BLOB,
+        created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+        updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users (updated_at);
+    CREATE INDEX IF NOT EXISTS idx_users_role_branch ON users (role, branch);
+    CREATE TRIGGER IF NOT EXISTS trg_users_updated_at
+    AFTER UPDATE OF name, role, branch, designation, face_encoding ON users
+    BEGIN
+        UPDATE users SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+    END;
+
+    CREATE TABLE IF NOT EXISTS face_templates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+        encoding BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_face_templates_user ON face_templates (user_id, id);
+
+    CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        role TEXT NOT NULL CHECK (role IN ('student', 'teacher')),
+        branch TEXT,
+        designation TEXT,
+        date DATE NOT NULL,
+        time TIME NOT NULL,
+        session TEXT NOT NULL DEFAULT '',
+        timestamp TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+        UNIQUE (user_id, date, session)
+    );
+    CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_attendance_user_timestamp ON attendance (user_id, timestamp);
+
+    CREATE TABLE IF NOT EXISTS attendance_daily (
+        user_id TEXT NOT NULL,
+        date DATE NOT NULL,
+        role TEXT NOT NULL,
+        branch TEXT NOT NULL DEFAULT '',
+        sessions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, date)
+    );
+    CREATE INDEX IF NOT EXISTS idx_attendance_daily_date ON attendance_daily (date, role, branch);
+    CREATE TABLE IF NOT EXISTS attendance_monthly (
+        month DATE NOT NULL,
+        role TEXT NOT NULL,
+        branch TEXT NOT NULL DEFAULT '',
+        user_days INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, role, branch)
+    );
+    CREATE TABLE IF NOT EXISTS attendance_calendar (
+        date DATE PRIMARY KEY,
+        users INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_summaries AFTER INSERT ON attendance
+    BEGIN
+        INSERT INTO attendance_monthly (month, role, branch, user_days)
+        SELECT strftime('%Y-%m-01', NEW.date), NEW.role, COALESCE(NEW.branch, ''), 1
+        WHERE NOT EXISTS (SELECT 1 FROM attendance_daily
+                          WHERE user_id = NEW.user_id AND date = NEW.date)
+        ON CONFLICT (month, role, branch) DO UPDATE SET user_days = user_days + 1;
+        INSERT INTO attendance_calendar (date, users)
+        SELECT NEW.date, 1
+        WHERE NOT EXISTS (SELECT 1 FROM attendance_daily
+                          WHERE user_id = NEW.user_id AND date = NEW.date)
+        ON CONFLICT (date) DO UPDATE SET users = users + 1;
+        INSERT INTO attendance_daily (user_id, date, role, branch, sessions)
+        VALUES (NEW.user_id, NEW.date, NEW.role, COALESCE(NEW.branch, ''), 1)
+        ON CONFLICT (user_id, date) DO UPDATE SET sessions = sessions + 1;
+    END;
+"""
+
+
+def _translate(query):
+    """Rewrite the MySQL dialect DatabaseQueries uses into SQLite"""
+    return query.replace('%s', '?').replace('INSERT IGNORE', 'INSERT OR IGNORE')
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3, optionally returning dict rows"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=()):
+        self._cursor.execute(_translate(query), params)
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(_translate(query), rows)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((column[0] for column in self._cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Wraps a sqlite3 connection with the cursor API DatabaseQueries expects"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, dictionary=False, prepared=False, buffered=None):
+        # sqlite3 caches compiled statements itself and always streams rows
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def prepared(self, query, dictionary=False):
+        return self.cursor(dictionary=dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLiteConfig:
+    """Drop-in for DatabaseConfig backed by a local SQLite file in WAL mode.
+
+    Each thread gets its own connection. WAL lets readers (history, reports)
+    run while the attendance writer commits, and synchronous=NORMAL makes a
+    commit a local append without an fsync per transaction.
+
+    The database must be a file: ':memory:' would give every thread its own
+    empty database. Use a temporary file for throwaway databases.
+    """
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, busy_timeout=5.0):
+        if path == ':memory:' or str(path).startswith('file::memory:'):
+            raise ValueError("SQLite backend needs a database file shared by its threads; "
+                             "use a temporary file instead of ':memory:'")
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._schema_ready = False
+        # Every per-thread connection, so close() can release them all
+        self._connections = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                     detect_types=sqlite3.PARSE_DECLTYPES,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        if not self._schema_ready:
+            # A standalone database needs no separate setup step
+            connection.executescript(SCHEMA)
+            self._schema_ready = True
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = SQLiteConnection(self._connect())
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        try:
+            yield connection
+        except Exception:
+            connection.rollback()
+            raise
+
+    def pool_stats(self):
+        """SQLite has no connection pool; kept for interface parity"""
+        return {}
+
+    def close(self):
+        """Close the connection of every thread that used this config"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error as e:
+                print(f"Error closing SQLite connection: {e}")
+        self._local = threading.local()
+
+    def get_connection(self):
+        """Create and return a dedicated connection"""
+        try:
+            return SQLiteConnection(self._connect())
+        except sqlite3.Error as e:
+            print(f"Error opening SQLite database: {e}")
+            return None
+
+    def initialize_database(self):
+        """Create tables, indexes and triggers if they don't exist"""
+        try:
+            self._schema_ready = False
+            self._connect().close()
+            print("Database initialized successfully")
+            return True
+        except sqlite3.Error as e:
+            print(f"Error initializing database: {e}")
+            return False
+
+
+class SQLiteQueries(DatabaseQueries):
+    """DatabaseQueries on SQLite; overrides the queries whose SQL differs from MySQL"""
+
+    def __init__(self, db_config=None):
+        super().__init__(db_config or SQLiteConfig())
+
+    @metrics.timed('db_upsert_users')
+    def upsert_users(self, users):
+        """Insert or update many users and their templates in one transaction"""
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                query = """
+                    INSERT INTO users (user_id, name, role, branch, designation, face_encoding)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        name = excluded.name, role = excluded.role, branch = excluded.branch,
+                        designation = excluded.designation, face_encoding = excluded.face_encoding
+                """
+                cursor.executemany(query, users)
+                self._replace_single_templates(cursor, users)
+                connection.commit()
+                cursor.close()
+            return True
+        except DB_ERRORS as e:
+            print(f"Error upserting users: {e}")
+            return False
+
+    @metrics.timed('db_rebuild_attendance_summaries')
+    def rebuild_attendance_summaries(self):
+        """Recompute every summary table from the attendance table in one transaction"""
+        try:
+            with self.db_config.connection() as connection:
+                cursor = connection.cursor()
+                for table in ('attendance_daily', 'attendance_monthly', 'attendance_calendar'):
+                    cursor.execute(f"DELETE FROM {table}")
+                cursor.execute("""
+                    INSERT INTO attendance_daily (user_id, date, role, branch, sessions)
+                    SELECT user_id, date, MIN(role), COALESCE(MIN(branch), ''), COUNT(*)
+                    FROM attendance GROUP BY user_id, date
+                """)
+                cursor.execute("""
+                    INSERT INTO attendance_monthly (month, role, branch, user_days)
+                    SELECT strftime('%Y-%m-01', date) AS month, role, branch, COUNT(*)
+                    FROM attendance_daily GROUP BY month, role, branch
+                """)
+                cursor.execute("""
+                    INSERT INTO attendance_calendar (date, users)
+                    SELECT date, COUNT(*) FROM attendance_daily GROUP BY date
+                """)
+                cursor.execute("SELECT COUNT(*) FROM attendance_daily")
+                (user_days,) = cursor.fetchone()
+                connection.commit()
+                cursor.close()
+            return user_days
+        except DB_ERRORS as e:
+            print(f"Error rebuilding attendance summaries: {e}")
+            return None
@@ -0,0 +1,36 @@
+"""Storage backend selection
+
+FACE_ATTENDANCE_DB picks the backend: 'mysql' (default) or 'sqlite'. The
+SQLite file defaults to ~/.face_attendance/attendance.db and can be moved
+with FACE_ATTENDANCE_SQLITE_PATH.
+"""
+import os
+from database.db_config import DatabaseConfig
+from database.db_queries import DatabaseQueries
+from database.sqlite_backend import DEFAULT_SQLITE_PATH, SQLiteConfig, SQLiteQueries
+
+BACKENDS = ('mysql', 'sqlite')
+
+
+def backend_name(backend=None):
+    """Return the configured backend name"""
+    backend = (backend or os.environ.get('FACE_ATTENDANCE_DB') or 'mysql').lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}', expected one of {BACKENDS}")
+    return backend
+
+
+def create_db_config(backend=None, sqlite_path=None):
+    """Create the connection config for the configured backend"""
+    if backend_name(backend) == 'sqlite':
+        return SQLiteConfig(sqlite_path or os.environ.get('FACE_ATTENDANCE_SQLITE_PATH')
+                            or DEFAULT_SQLITE_PATH)
+    return DatabaseConfig()
+
+
+def create_queries(backend=None, sqlite_path=None):
+    """Create the query layer for the configured backend"""
+    db_config = create_db_config(backend, sqlite_path)
+    if isinstance(db_config, SQLiteConfig):
+        return SQLiteQueries(db_config)
+    return DatabaseQueries(db_config)
@@ -0,0 +1,104 @@
+"""Lazily paged table model for attendance history"""
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+
+class AttendanceTableModel(QAbstractTableModel):
+    """Attendance history fetched a page at a time as the view scrolls.
+
+    Pages are loaded on a background thread with keyset pagination, so the
+    GUI never waits on the database and only the rows scrolled into view
+    are ever fetched. Changing the filters discards pages still in flight.
+    """
+    HEADERS = ["User ID", "Name", "Role", "Branch/Designation", "Date", "Time", "Timestamp"]
+
+    # (filter generation, rows, more rows available)
+    page_loaded = pyqtSignal(int, object, bool)
+
+    def __init__(self, attendance_tracker, page_size=200, parent=None):
+        super().__init__(parent)
+        self.attendance_tracker = attendance_tracker
+        self.page_size = page_size
+        self._rows = []
+        self._filters = {}
+        self._after = None
+        self._has_more = False
+        self._loading = False
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.page_loaded.connect(self._on_page_loaded)
+
+    def set_filters(self, user_id=None, date=None, role=None):
+        """Clear the model and start loading rows matching the filters"""
+        self.beginResetModel()
+        self._generation += 1
+        self._filters = {'user_id': user_id, 'date': date, 'role': role}
+        self._rows = []
+        self._after = None
+        self._has_more = True
+        self._loading = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        record = self._rows[index.row()]
+        column = index.column()
+        if column == 0:
+            return record['user_id']
+        if column == 1:
+            return record['name']
+        if column == 2:
+            return record['role'].capitalize()
+        if column == 3:
+            return record.get('branch') or record.get('designation') or 'N/A'
+        if column == 4:
+            return str(record['date'])
+        if column == 5:
+            return str(record['time'])
+        return str(record.get('timestamp', 'N/A'))
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        self._executor.submit(self._load, self._generation, dict(self._filters), self._after)
+
+    def _load(self, generation, filters, after):
+        # Runs on the executor thread; the signal is delivered on the GUI thread
+        rows = self.attendance_tracker.get_attendance_page(after=after, limit=self.page_size,
+                                                           **filters)
+        self.page_loaded.emit(generation, rows, len(rows) == self.page_size)
+
+    def _on_page_loaded(self, generation, rows, has_more):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._has_more = has_more
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+        self._after = (rows[-1]['timestamp'], rows[-1]['id'])
+
+    def close(self):
+        """Stop the loader thread"""
+        self._generation += 1
+        self._executor.shutdown(wait=False)
@@ -1,23 +1,44 @@
 """Attendance window for marking attendance and viewing history"""
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                             QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
-                             QMessageBox, QDateEdit, QComboBox)
-from PyQt5.QtCore import Qt, QTimer, QDate
+                             QLabel, QTableView, QHeaderView, QLineEdit,
+                             QMessageBox, QDateEdit, QComboBox, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer, QDate, pyqtSignal
 from PyQt5.QtGui import QFont, QImage, QPixmap
-import cv2
-from datetime import datetime
+import time
 from core.attendance import AttendanceTracker
-from core.face_recognition import FaceRecognizer
+from core.auto_attendance import AutoAttendance
+from core.rate_controller import rate_controller_from_env
+from core.tracker import FaceTracker
+from gui.recognition_worker import RecognitionWorker
+from gui.attendance_model import AttendanceTableModel
+from utils.metrics import metrics
 
 class AttendanceWindow(QWidget):
+    # Emitted from the attendance writer thread, delivered on the GUI thread
+    attendance_saved = pyqtSignal(object, bool)
+    
+    # Tracker settings while auto mode is on: detect and re-verify faces
+    # often enough to collect votes during a walk-by
+    AUTO_DETECT_EVERY = 3
+    AUTO_REENCODE_EVERY = 1
+    
     def __init__(self, show_history=False):
         super().__init__()
         self.show_history_mode = show_history
         self.camera = None
+        self.recognition_worker = None
+        self.face_tracker = None
+        self.history_model = None
+        self.auto_mode = False
+        self.status_hold_until = 0.0
+        self.last_results = []
+        self.last_frame_sequence = 0
         self.attendance_tracker = AttendanceTracker()
-        self.face_recognizer = FaceRecognizer()
+        self.auto_attendance = AutoAttendance(self.attendance_tracker)
+        # Only camera windows need the gallery; taken from the shared service
+        self.face_recognizer = None
         self.last_recognized = None
-        self.last_attendance_time = None
+        self.attendance_saved.connect(self.on_attendance_saved)
         
         if show_history:
             self.setWindowTitle("Attendance History")
@@ -87,6 +108,12 @@ class AttendanceWindow(QWidget):
         self.mark_btn.clicked.connect(self.mark_attendance)
         button_layout.addWidget(self.mark_btn)
         
+        self.auto_checkbox = QCheckBox("Auto Mode")
+        self.auto_checkbox.setFont(QFont("Arial", 12))
+        self.auto_checkbox.setToolTip("Mark attendance automatically for confidently recognized faces")
+        self.auto_checkbox.toggled.connect(self.set_auto_mode)
+        button_layout.addWidget(self.auto_checkbox)
+        
         self.history_btn = QPushButton("View History")
         self.history_btn.setFont(QFont("Arial", 12))
         self.history_btn.setStyleSheet("""
@@ -123,10 +150,10 @@ class AttendanceWindow(QWidget):
         
         layout.addLayout(button_layout)
         
-        # Timer for video updates and auto-attendance
+        # Timer for video preview; recognition runs on a worker thread
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
-        self.timer.start(100)  # Update every 100ms
+        self.timer.start(15)  # Poll faster than the camera delivers frames
     
     def init_history_ui(self, layout):
         """Initialize history viewing UI"""
@@ -153,6 +180,12 @@ class AttendanceWindow(QWidget):
         self.role_filter.currentTextChanged.connect(self.refresh_history)
         filter_layout.addWidget(self.role_filter)
         
+        filter_layout.addWidget(QLabel("User ID:"))
+        self.user_filter = QLineEdit()
+        self.user_filter.setPlaceholderText("All users")
+        self.user_filter.editingFinished.connect(self.refresh_history)
+        filter_layout.addWidget(self.user_filter)
+        
         refresh_btn = QPushButton("Refresh")
         refresh_btn.clicked.connect(self.refresh_history)
         filter_layout.addWidget(refresh_btn)
@@ -160,12 +193,10 @@ class AttendanceWindow(QWidget):
         filter_layout.addStretch()
         layout.addLayout(filter_layout)
         
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "User ID", "Name", "Role", "Branch/Designation", "Date", "Time", "Timestamp"
-        ])
+        # Table; rows are fetched page by page as the view scrolls
+        self.history_model = AttendanceTableModel(self.attendance_tracker, parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.history_model)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setFont(QFont("Arial", 10))
@@ -191,35 +222,103 @@ class AttendanceWindow(QWidget):
         self.refresh_history()
     
     def start_camera(self):
-        """Start the camera"""
+        """Start the capture thread and the recognition worker"""
+        # Vision modules are imported here, not at module level, so the
+        # history view opens without loading OpenCV and the face models
+        from core.capture import FrameGrabber
+        from core.gallery_service import gallery_service
         try:
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened():
+            self.camera = FrameGrabber(0)
+            if not self.camera.is_opened():
                 QMessageBox.critical(self, "Error", "Could not open camera")
+                self.camera = None
+                return
+            self.camera.start()
+            self.face_recognizer = gallery_service.recognizer()
+            gallery_service.subscribe(self.on_gallery_changed)
+            self.face_tracker = FaceTracker(self.face_recognizer)
+            self.default_detect_every = self.face_tracker.detect_every
+            self.set_auto_mode(self.auto_mode)
+            # Recognition rate follows the measured cost, see FACE_ATTENDANCE_CPU_BUDGET
+            self.recognition_worker = RecognitionWorker(
+                self.camera, self.face_recognizer, self.face_tracker, self,
+                rate_controller=rate_controller_from_env()
+            )
+            self.recognition_worker.results_ready.connect(self.on_recognition_results)
+            self.recognition_worker.start()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Camera error: {str(e)}")
     
+    def on_gallery_changed(self, recognizer):
+        """Re-identify tracked faces against the reloaded gallery"""
+        # Called on the thread that changed the gallery; the worker owns the tracker
+        if self.recognition_worker is not None:
+            self.recognition_worker.reset_tracker()
+    
+    def set_auto_mode(self, enabled):
+        """Switch hands-free marking on or off"""
+        self.auto_mode = enabled
+        self.auto_attendance.reset()
+        self.mark_btn.setEnabled(not enabled)
+        if self.face_tracker is not None:
+            if enabled:
+                self.face_tracker.detect_every = self.AUTO_DETECT_EVERY
+                self.face_tracker.reencode_every = self.AUTO_REENCODE_EVERY
+            else:
+                self.face_tracker.detect_every = self.default_detect_every
+                self.face_tracker.reencode_every = None
+    
     def update_frame(self):
-        """Update video frame and recognize faces"""
+        """Render the newest camera frame with the latest recognition results"""
         if self.camera is None:
             return
         
-        ret, frame = self.camera.read()
-        if not ret:
+        sequence, frame = self.camera.latest()
+        if frame is None or sequence == self.last_frame_sequence:
             return
+        self.last_frame_sequence = sequence
+        metrics.counter('frames_rendered').inc()
         
-        # Recognize face
-        user_info = self.face_recognizer.recognize_face(frame)
+        import cv2
+        with metrics.timer('draw'):
+            frame = frame.copy()
+            for result in self.last_results:
+                user_info = result['match']
+                if user_info is None:
+                    continue
+                # Draw rectangle and label
+                top, right, bottom, left = result['location']
+                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+                label = f"{user_info['name']} ({user_info['user_id']})"
+                cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
+                cv2.putText(frame, label, (left + 6, bottom - 6),
+                           cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
+        
+        # Convert to QImage
+        with metrics.timer('qimage'):
+            height, width, channel = frame.shape
+            bytes_per_line = 3 * width
+            q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_BGR888)
+            pixmap = QPixmap.fromImage(q_image).scaled(
+                self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
+            )
+        with metrics.timer('display'):
+            self.video_label.setPixmap(pixmap)
+    
+    def on_recognition_results(self, sequence, results):
+        """Update status from the recognition worker's latest results"""
+        self.last_results = results
+        if self.auto_mode:
+            self.auto_attendance.update(results, callback=self.attendance_saved.emit)
+        from core.face_recognition import FaceRecognizer
+        user_info = FaceRecognizer.best_match(results)
+        if user_info:
+            self.last_recognized = user_info
+        # Keep auto mode confirmations readable for a moment
+        if time.monotonic() < self.status_hold_until:
+            return
         
         if user_info:
-            # Draw rectangle and label
-            top, right, bottom, left = user_info['location']
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-            label = f"{user_info['name']} ({user_info['user_id']})"
-            cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
-            cv2.putText(frame, label, (left + 6, bottom - 6),
-                       cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-            
             # Update status
             branch_designation = user_info.get('branch') or user_info.get('designation', 'N/A')
             self.status_label.setText(
@@ -227,20 +326,9 @@ class AttendanceWindow(QWidget):
                 f"Role: {user_info['role'].capitalize()} | {branch_designation}"
             )
             self.status_label.setStyleSheet("color: #27ae60; margin: 10px; padding: 10px; background-color: white; border-radius: 5px;")
-            
-            self.last_recognized = user_info
         else:
             self.status_label.setText("No face recognized. Position your face in front of the camera.")
             self.status_label.setStyleSheet("color: #e74c3c; margin: 10px; padding: 10px; background-color: white; border-radius: 5px;")
-        
-        # Convert to QImage
-        height, width, channel = frame.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_BGR888)
-        pixmap = QPixmap.fromImage(q_image)
-        self.video_label.setPixmap(pixmap.scaled(
-            self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
-        ))
     
     def mark_attendance(self):
         """Mark attendance for recognized user"""
@@ -248,32 +336,38 @@ class AttendanceWindow(QWidget):
             QMessageBox.warning(self, "Error", "No face recognized. Please position your face in front of the camera.")
             return
         
-        # Prevent duplicate attendance within 1 minute
-        current_time = datetime.now()
-        if (self.last_attendance_time and 
-            (current_time - self.last_attendance_time).seconds < 60 and
-            self.last_recognized['user_id'] == self.last_recognized.get('last_marked_id')):
-            QMessageBox.information(self, "Info", "Attendance already marked recently. Please wait.")
-            return
-        
+        # The tracker's cooldown rejects repeats for this user in the current session
         user_info = self.last_recognized
-        success = self.attendance_tracker.mark_attendance(
+        record = self.attendance_tracker.mark_attendance_async(
             user_info['user_id'],
             user_info['name'],
             user_info['role'],
             user_info.get('branch'),
-            user_info.get('designation')
+            user_info.get('designation'),
+            callback=self.attendance_saved.emit
         )
-        
+        if record is None:
+            QMessageBox.information(
+                self, "Info", f"Attendance already marked for {user_info['name']} today."
+            )
+    
+    def on_attendance_saved(self, record, success):
+        """Confirm a queued attendance write once it has been committed"""
+        if self.auto_mode:
+            # No dialogs in hands-free mode; they would hold up the queue
+            if success:
+                self.status_label.setText(f"Attendance marked for {record['name']}")
+            else:
+                self.status_label.setText(f"Failed to mark attendance for {record['name']}")
+            self.status_hold_until = time.monotonic() + 2.0
+            return
         if success:
             QMessageBox.information(
                 self, "Success",
-                f"Attendance marked successfully for {user_info['name']}!"
+                f"Attendance marked successfully for {record['name']}!"
             )
-            self.last_attendance_time = current_time
-            self.last_recognized['last_marked_id'] = user_info['user_id']
         else:
-            QMessageBox.warning(self, "Error", "Failed to mark attendance")
+            QMessageBox.warning(self, "Error", f"Failed to mark attendance for {record['name']}")
     
     def show_history(self):
         """Open history window"""
@@ -285,31 +379,26 @@ class AttendanceWindow(QWidget):
         if not self.show_history_mode:
             return
         
-        # Get selected date
+        # Filters run in SQL; the model loads the first page in the background
         selected_date = self.date_filter.date().toPyDate()
-        records = self.attendance_tracker.get_attendance_history(date=selected_date)
-        
-        # Filter by role if needed
         role_filter = self.role_filter.currentText()
-        if role_filter != "All":
-            records = [r for r in records if r['role'].lower() == role_filter.lower()]
-        
-        # Populate table
-        self.table.setRowCount(len(records))
-        for row, record in enumerate(records):
-            self.table.setItem(row, 0, QTableWidgetItem(record['user_id']))
-            self.table.setItem(row, 1, QTableWidgetItem(record['name']))
-            self.table.setItem(row, 2, QTableWidgetItem(record['role'].capitalize()))
-            
-            branch_designation = record.get('branch') or record.get('designation', 'N/A')
-            self.table.setItem(row, 3, QTableWidgetItem(branch_designation))
-            self.table.setItem(row, 4, QTableWidgetItem(str(record['date'])))
-            self.table.setItem(row, 5, QTableWidgetItem(str(record['time'])))
-            self.table.setItem(row, 6, QTableWidgetItem(str(record.get('timestamp', 'N/A'))))
+        self.history_model.set_filters(
+            user_id=self.user_filter.text().strip() or None,
+            date=selected_date,
+            role=role_filter.lower() if role_filter != "All" else None
+        )
     
     def closeEvent(self, event):
         """Handle window close"""
+        if self.recognition_worker is not None:
+            self.recognition_worker.stop()
+        if self.face_recognizer is not None:
+            from core.gallery_service import gallery_service
+            gallery_service.unsubscribe(self.on_gallery_changed)
         if self.camera is not None:
-            self.camera.release()
+            self.camera.stop()
+        if self.history_model is not None:
+            self.history_model.close()
+        self.attendance_tracker.close()
         event.accept()
 
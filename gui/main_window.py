@@ -3,8 +3,13 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QLabel, QMessageBox, QStackedWidget)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QFont, QIcon
-from gui.register_window import RegisterWindow
-from gui.attendance_window import AttendanceWindow
+import importlib
+import threading
+
+# The camera windows pull in OpenCV, dlib and the face models, which take
+# longer to import than everything else together, so they are imported
+# when first opened rather than before the menu can be shown
+CAMERA_MODULES = ('gui.attendance_window', 'gui.register_window')
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -110,18 +115,43 @@ class MainWindow(QMainWindow):
             }
         """)
     
+    def prewarm(self, load_gallery=False):
+        """Import the camera windows in a background thread once the menu is up.
+        
+        A window opened while this is still running waits for the import
+        in progress instead of starting its own. With load_gallery the
+        shared face gallery is loaded as well, so the first attendance
+        window starts recognizing immediately.
+        """
+        def warm():
+            try:
+                for module in CAMERA_MODULES:
+                    importlib.import_module(module)
+                if load_gallery:
+                    from core.gallery_service import gallery_service
+                    gallery_service.recognizer()
+            except Exception as e:
+                print(f"Error prewarming camera windows: {e}")
+        
+        thread = threading.Thread(target=warm, name='prewarm', daemon=True)
+        thread.start()
+        return thread
+    
     def open_register_window(self):
         """Open registration window"""
+        from gui.register_window import RegisterWindow
         self.register_window = RegisterWindow()
         self.register_window.show()
     
     def open_attendance_window(self):
         """Open attendance window"""
+        from gui.attendance_window import AttendanceWindow
         self.attendance_window = AttendanceWindow()
         self.attendance_window.show()
     
     def open_history_window(self):
         """Open history window"""
+        from gui.attendance_window import AttendanceWindow
         self.history_window = AttendanceWindow(show_history=True)
         self.history_window.show()
 
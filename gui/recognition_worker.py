@@ -0,0 +1,78 @@
+"""Background face recognition worker for camera windows"""
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from utils.metrics import metrics
+
+
+class RecognitionWorker(QThread):
+    """Runs recognition on the newest captured frame, off the GUI thread.
+
+    Frames that arrive while a recognition is in progress are skipped, so
+    results lag by at most one recognition and never pile up. With a
+    rate_controller, the worker also waits between recognitions as the
+    controller decides; frames skipped while waiting count as throttled,
+    not dropped.
+    """
+    # (frame sequence number, list of per-face results)
+    results_ready = pyqtSignal(int, object)
+
+    # Longest uninterrupted sleep, so stop() never waits long
+    MAX_SLEEP = 0.05
+
+    def __init__(self, grabber, face_recognizer, tracker=None, parent=None, rate_controller=None):
+        super().__init__(parent)
+        self.grabber = grabber
+        self.face_recognizer = face_recognizer
+        self.tracker = tracker
+        self.rate_controller = rate_controller
+        self._reset_requested = threading.Event()
+
+    def run(self):
+        last_sequence = 0
+        throttled = False
+        while not self.isInterruptionRequested():
+            if self.rate_controller is not None:
+                delay = self.rate_controller.delay()
+                if delay > 0:
+                    time.sleep(min(delay, self.MAX_SLEEP))
+                    throttled = True
+                    continue
+            sequence, frame = self.grabber.wait_for_frame(last_sequence, timeout=0.1)
+            if frame is None:
+                continue
+            if last_sequence and sequence > last_sequence + 1:
+                skipped = 'frames_throttled' if throttled else 'frames_dropped'
+                metrics.counter(skipped).inc(sequence - last_sequence - 1)
+            last_sequence = sequence
+            throttled = False
+            start = time.perf_counter()
+            try:
+                if self.tracker is not None:
+                    if self._reset_requested.is_set():
+                        self._reset_requested.clear()
+                        self.tracker.reset()
+                    with metrics.timer('track'):
+                        results = self.tracker.update(frame)
+                else:
+                    results = self.face_recognizer.recognize_faces(frame)
+            except Exception as e:
+                print(f"Error recognizing faces: {e}")
+                continue
+            if self.rate_controller is not None:
+                self.rate_controller.record(time.perf_counter() - start, len(results))
+            metrics.counter('frames_processed').inc()
+            self.results_ready.emit(sequence, results)
+
+    def reset_tracker(self):
+        """Drop all tracks before the next frame, e.g. after the gallery changed.
+
+        Safe from any thread: the reset itself runs on the worker thread,
+        so it cannot be overwritten by an update already in progress.
+        """
+        self._reset_requested.set()
+
+    def stop(self):
+        """Ask the worker to finish and wait for it"""
+        self.requestInterruption()
+        self.wait()
@@ -3,11 +3,14 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QLabel, QLineEdit, QComboBox, QMessageBox, QTextEdit)
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont, QImage, QPixmap
+import time
 import cv2
 import numpy as np
 import face_recognition
 from core.register import Registration
-from core.face_recognition import FaceRecognizer
+from core.rate_controller import RateController
+from core.gallery_service import gallery_service
+from gui.registration_worker import RegistrationWorker
 
 class RegisterWindow(QWidget):
     def __init__(self):
@@ -15,8 +18,24 @@ class RegisterWindow(QWidget):
         self.setWindowTitle("Face Registration")
         self.setGeometry(150, 150, 900, 700)
         self.camera = None
-        self.registration = Registration()
-        self.face_recognizer = FaceRecognizer()
+        
+        # Preview detection runs on a downscaled frame at a rate that keeps
+        # it within a quarter of one core and slows down while nobody is in
+        # view; the full-resolution frame is only used for the final capture
+        self.preview_scale = 0.5
+        self.preview_rate = RateController(cpu_budget=0.25, name='preview')
+        self.last_face_location = None
+        
+        # Registration captures a burst of frames so the user is enrolled
+        # with several templates under slightly different pose and lighting
+        self.burst_size = 5
+        self.burst_interval = 0.15  # Seconds between burst frames
+        self.burst_frames = []
+        self.last_burst_capture = 0.0
+        self.pending_registration = None
+        self.registration_worker = None
+        
+        self.registration = Registration(gallery_service=gallery_service)
         self.init_ui()
         self.start_camera()
     
@@ -169,12 +188,19 @@ class RegisterWindow(QWidget):
         
         ret, frame = self.camera.read()
         if ret:
-            # Detect face and draw rectangle
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = self.detect_face(rgb_frame)
+            if self.pending_registration is not None:
+                self.collect_burst_frame(frame)
             
-            if face_locations:
-                top, right, bottom, left = face_locations[0]
+            # Detect face when the rate controller allows and reuse the last
+            # box on the frames in between
+            if self.preview_rate.delay() <= 0:
+                start = time.perf_counter()
+                self.last_face_location = self.detect_face(frame, self.preview_scale)
+                self.preview_rate.record(time.perf_counter() - start,
+                                         int(self.last_face_location is not None))
+            
+            if self.last_face_location:
+                top, right, bottom, left = self.last_face_location
                 cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
                 cv2.putText(frame, "Face Detected", (left, top - 10),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -188,12 +214,17 @@ class RegisterWindow(QWidget):
                 self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
             ))
     
-    def detect_face(self, frame):
-        """Detect face in frame"""
-        face_locations = face_recognition.face_locations(frame)
+    def detect_face(self, frame, scale=1.0):
+        """Detect the first face in a BGR frame, detecting at the given scale"""
+        if scale != 1.0:
+            small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+        else:
+            small_frame = frame
+        rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        face_locations = face_recognition.face_locations(rgb_frame)
         if len(face_locations) > 0:
-            # Scale back (if frame was resized)
-            return face_locations[0]
+            # Scale back to full-frame coordinates
+            return tuple(int(value / scale) for value in face_locations[0])
         return None
     
     def capture_and_register(self):
@@ -221,21 +252,46 @@ class RegisterWindow(QWidget):
             QMessageBox.warning(self, "Validation Error", "Please enter designation for teachers")
             return
         
-        # Capture frame
-        ret, frame = self.camera.read()
-        if not ret:
-            QMessageBox.warning(self, "Error", "Failed to capture frame")
+        # Frames are collected by update_frame, then registered together
+        self.pending_registration = (user_id, name, role, branch, designation)
+        self.burst_frames = []
+        self.last_burst_capture = 0.0
+        self.capture_btn.setEnabled(False)
+        self.status_label.setText("Capturing... hold still and look at the camera")
+    
+    def collect_burst_frame(self, frame):
+        """Keep every burst_interval-th frame until the burst is complete"""
+        now = time.monotonic()
+        if now - self.last_burst_capture < self.burst_interval:
             return
+        self.last_burst_capture = now
+        # Copy before the preview draws on the frame
+        self.burst_frames.append(frame.copy())
+        if len(self.burst_frames) >= self.burst_size:
+            self.finish_registration()
+    
+    def finish_registration(self):
+        """Register the pending user from the captured burst on a worker thread"""
+        frames, self.burst_frames = self.burst_frames, []
+        registration, self.pending_registration = self.pending_registration, None
+        self.status_label.setText("Registering...")
         
-        # Register
-        success, message = self.registration.capture_and_register(
-            frame, user_id, name, role, branch, designation
-        )
+        # The capture button stays disabled until the worker reports back
+        self.registration_worker = RegistrationWorker(self.registration, frames, registration)
+        self.registration_worker.registration_done.connect(self.on_registration_done)
+        self.registration_worker.start()
+    
+    def on_registration_done(self, success, message):
+        """Report the outcome of a registration; runs on the GUI thread"""
+        # run() is returning; wait so the thread is not destroyed while running
+        self.registration_worker.wait()
+        self.registration_worker = None
+        self.capture_btn.setEnabled(True)
+        self.status_label.setText("Position your face in front of the camera")
         
         if success:
+            # Registration has already put the new templates into the shared gallery
             QMessageBox.information(self, "Success", message)
-            # Refresh face recognizer
-            self.face_recognizer.refresh_database()
             # Clear inputs
             self.user_id_input.clear()
             self.name_input.clear()
@@ -247,5 +303,8 @@ class RegisterWindow(QWidget):
         """Handle window close"""
         if self.camera is not None:
             self.camera.release()
+        if self.registration_worker is not None:
+            # Let the user's templates finish saving before the thread is destroyed
+            self.registration_worker.wait()
         event.accept()
 
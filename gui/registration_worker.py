@@ -0,0 +1,27 @@
+"""Background registration worker for the registration window"""
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class RegistrationWorker(QThread):
+    """Registers one user from a captured burst, off the GUI thread.
+
+    Detecting and encoding every full-resolution burst frame and writing
+    the templates takes seconds; the window stays responsive meanwhile
+    and gets the outcome through registration_done.
+    """
+    # (success, message) as returned by Registration.register_burst
+    registration_done = pyqtSignal(bool, str)
+
+    def __init__(self, registration, frames, details, parent=None):
+        super().__init__(parent)
+        self.registration = registration
+        self.frames = frames
+        # (user_id, name, role, branch, designation)
+        self.details = details
+
+    def run(self):
+        try:
+            success, message = self.registration.register_burst(self.frames, *self.details)
+        except Exception as e:
+            success, message = False, f"Registration error: {e}"
+        self.registration_done.emit(success, message)
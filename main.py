@@ -1,24 +1,36 @@
 """Main entry point for Face Attendance System"""
+import os
 import sys
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication, QMessageBox
-from database.db_config import DatabaseConfig
+from database.storage import create_db_config
 from gui.main_window import MainWindow
+from utils.metrics import start_metrics_from_env
 
 def main():
     """Main function to run the application"""
     app = QApplication(sys.argv)
     
+    # Optional Prometheus endpoint, see FACE_ATTENDANCE_METRICS_PORT
+    start_metrics_from_env()
+    
     # Initialize database
-    db_config = DatabaseConfig()
+    db_config = create_db_config()
     if not db_config.initialize_database():
         QMessageBox.critical(None, "Database Error", 
-                           "Failed to initialize database. Please check your MySQL connection settings.")
+                           "Failed to initialize database. Please check your database connection settings.")
         sys.exit(1)
     
     # Create and show main window
     window = MainWindow()
     window.show()
     
+    # Import the camera windows in the background once the menu is painted;
+    # FACE_ATTENDANCE_PREWARM=gallery also loads the face gallery, =off disables
+    prewarm = os.environ.get('FACE_ATTENDANCE_PREWARM', 'on').lower()
+    if prewarm != 'off':
+        QTimer.singleShot(0, lambda: window.prewarm(load_gallery=prewarm == 'gallery'))
+    
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
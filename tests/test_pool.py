@@ -0,0 +1,124 @@
+"""Connection pool: a reused connection must see rows committed elsewhere"""
+import pytest
+from mysql.connector import Error
+from database.pool import ConnectionPool
+
+
+class FakeServer:
+    """Committed state shared by FakeConnections"""
+
+    def __init__(self):
+        self.rows = []
+
+
+class FakeConnection:
+    """Mimics InnoDB REPEATABLE READ with autocommit off: the first read of a
+    transaction takes a snapshot that lasts until commit or rollback"""
+
+    def __init__(self, server):
+        self.server = server
+        self.snapshot = None
+        self.rollbacks = 0
+
+    @property
+    def in_transaction(self):
+        return self.snapshot is not None
+
+    def read(self):
+        if self.snapshot is None:
+            self.snapshot = list(self.server.rows)
+        return self.snapshot
+
+    def insert(self, row):
+        self.read().append(row)
+
+    def commit(self):
+        if self.snapshot is not None:
+            self.server.rows = self.snapshot
+        self.snapshot = None
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.snapshot = None
+
+    def close(self):
+        pass
+
+
+def test_reused_connection_sees_rows_committed_on_another():
+    server = FakeServer()
+    pool = ConnectionPool(lambda: FakeConnection(server), size=2)
+    with pool.connection() as reader:
+        assert reader.read() == []
+        with pool.connection() as writer:
+            writer.insert('row')
+            writer.commit()
+    # LIFO: the reader went back last and is handed out first
+    with pool.connection() as reused:
+        assert reused._connection is reader._connection
+        assert reused.read() == ['row']
+
+
+def test_committed_connection_is_not_rolled_back():
+    server = FakeServer()
+    pool = ConnectionPool(lambda: FakeConnection(server), size=1)
+    with pool.connection() as connection:
+        connection.insert('row')
+        connection.commit()
+    assert connection._connection.rollbacks == 0
+    assert server.rows == ['row']
+
+
+def test_uncommitted_work_is_rolled_back_on_release():
+    server = FakeServer()
+    pool = ConnectionPool(lambda: FakeConnection(server), size=1)
+    with pool.connection() as connection:
+        connection.insert('row')
+    with pool.connection() as connection:
+        assert connection.read() == []
+    assert server.rows == []
+
+
+@pytest.fixture
+def mysql_pool():
+    from database.db_config import DatabaseConfig
+    config = DatabaseConfig()
+    try:
+        config._connect().close()
+    except Error as e:
+        pytest.skip(f"MySQL not available: {e}")
+    pool = ConnectionPool(config._connect, size=2)
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("CREATE TABLE IF NOT EXISTS pool_snapshot_test (id INT PRIMARY KEY) "
+                       "ENGINE=InnoDB")
+        cursor.execute("DELETE FROM pool_snapshot_test")
+        connection.commit()
+        cursor.close()
+    yield pool
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("DROP TABLE pool_snapshot_test")
+        cursor.close()
+    pool.close_all()
+
+
+def count_rows(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM pool_snapshot_test")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+
+def test_mysql_reused_connection_sees_later_commit(mysql_pool):
+    with mysql_pool.connection() as reader:
+        assert count_rows(reader) == 0
+        with mysql_pool.connection() as writer:
+            cursor = writer.cursor()
+            cursor.execute("INSERT INTO pool_snapshot_test (id) VALUES (1)")
+            writer.commit()
+            cursor.close()
+    with mysql_pool.connection() as reused:
+        assert reused._connection is reader._connection
+        assert count_rows(reused) == 1
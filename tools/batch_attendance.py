@@ -0,0 +1,168 @@
+"""Take attendance offline from recorded videos and image folders
+
+Usage: python -m tools.batch_attendance recording.mp4 photos/ [--sample-fps 2] [--workers 4]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import cv2
+from core.gallery_service import gallery_service
+from core.embedding_cache import EmbeddingCache
+from core.cooldown import session_for
+from database.storage import create_queries
+from utils.profiles import PROFILES
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Recognizer owned by each pool worker process
+_recognizer = None
+
+
+def _init_worker(recognizer_options):
+    global _recognizer
+    # main() synced the snapshot already; workers only map it
+    gallery_service.configure(**dict(recognizer_options, sync_cache=False))
+    _recognizer = gallery_service.recognizer()
+
+
+def _sightings(frame, timestamp, tolerance):
+    """Return (match, timestamp) for every recognized face in frame"""
+    return [(result['match'], timestamp)
+            for result in _recognizer.recognize_faces(frame, tolerance)
+            if result['match'] is not None]
+
+
+def process_video_chunk(path, start_frame, end_frame, step, base_time, fps, tolerance):
+    """Recognize every step-th frame in [start_frame, end_frame) of a video"""
+    capture = cv2.VideoCapture(path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    sightings, processed = [], 0
+    for index in range(start_frame, end_frame):
+        # grab() skips decoding work for frames that are not sampled
+        if (index - start_frame) % step:
+            if not capture.grab():
+                break
+            continue
+        ret, frame = capture.read()
+        if not ret:
+            break
+        processed += 1
+        sightings.extend(_sightings(frame, base_time + timedelta(seconds=index / fps), tolerance))
+    capture.release()
+    return sightings, processed
+
+
+def process_images(paths, tolerance):
+    """Recognize a list of image files, stamping each with its modification time"""
+    sightings, processed = [], 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"Skipping unreadable image {path}")
+            continue
+        processed += 1
+        sightings.extend(_sightings(frame, datetime.fromtimestamp(os.path.getmtime(path)),
+                                    tolerance))
+    return sightings, processed
+
+
+def plan_jobs(inputs, sample_fps, chunk_seconds, start_time=None, images_per_job=50):
+    """Split inputs into independent (function, args) jobs for the pool"""
+    jobs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            images = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+            for offset in range(0, len(images), images_per_job):
+                jobs.append((process_images, (images[offset:offset + images_per_job],)))
+            continue
+
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            print(f"Skipping unreadable video {path}")
+            continue
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+
+        # Without an explicit start, assume the file was closed when recording ended
+        if start_time is not None:
+            base_time = start_time
+        else:
+            base_time = (datetime.fromtimestamp(os.path.getmtime(path))
+                         - timedelta(seconds=frame_count / fps))
+        step = max(1, round(fps / sample_fps))
+        chunk_frames = max(step, int(chunk_seconds * fps) // step * step)
+        for start in range(0, frame_count, chunk_frames):
+            end = min(start + chunk_frames, frame_count)
+            jobs.append((process_video_chunk, (path, start, end, step, base_time, fps)))
+    return jobs
+
+
+def deduplicate(sightings, session_minutes=None):
+    """Keep the earliest sighting per user per session.
+
+    A session is a calendar day, or a fixed window of session_minutes.
+    """
+    first_seen = {}
+    for match, timestamp in sorted(sightings, key=lambda sighting: sighting[1]):
+        key = (match['user_id'],) + session_for(timestamp, session_minutes)
+        if key not in first_seen:
+            first_seen[key] = (match, timestamp)
+    return sorted(first_seen.values(), key=lambda sighting: sighting[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='video files and/or image directories')
+    parser.add_argument('--sample-fps', type=float, default=2.0,
+                        help='video frames to analyse per second of footage')
+    parser.add_argument('--chunk-seconds', type=float, default=60.0,
+                        help='footage per parallel job')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    parser.add_argument('--session-minutes', type=int,
+                        help='deduplicate per time window instead of per day')
+    parser.add_argument('--start-time', type=datetime.fromisoformat,
+                        help='recording start, ISO format (default: derived from file time)')
+    parser.add_argument('--profile', choices=list(PROFILES),
+                        help='speed profile (default: FACE_ATTENDANCE_PROFILE or balanced)')
+    parser.add_argument('--dry-run', action='store_true', help='report without writing')
+    args = parser.parse_args()
+
+    jobs = plan_jobs(args.inputs, args.sample_fps, args.chunk_seconds, args.start_time)
+    db_queries = create_queries()
+    # Sync the gallery snapshot once so workers only map it
+    EmbeddingCache().sync(db_queries)
+    start = time.perf_counter()
+    sightings, processed = [], 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=({'profile': args.profile},)) as pool:
+        futures = [pool.submit(function, *job_args, args.tolerance)
+                   for function, job_args in jobs]
+        for future in futures:
+            job_sightings, job_processed = future.result()
+            sightings.extend(job_sightings)
+            processed += job_processed
+    elapsed = time.perf_counter() - start
+
+    attendance = deduplicate(sightings, args.session_minutes)
+    for match, timestamp in attendance:
+        print(f"{timestamp:%Y-%m-%d %H:%M:%S}  {match['user_id']}  {match['name']}")
+    print(f"Processed {processed} frames in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f} "
+          f"frames/s), {len(sightings)} sightings, {len(attendance)} attendance records")
+
+    if attendance and not args.dry_run:
+        records = [{'user_id': match['user_id'], 'name': match['name'], 'role': match['role'],
+                    'branch': match.get('branch'), 'designation': match.get('designation'),
+                    'timestamp': timestamp,
+                    'session': session_for(timestamp, args.session_minutes)[1]}
+                   for match, timestamp in attendance]
+        if not db_queries.mark_attendance_batch(records):
+            raise SystemExit("Failed to write attendance records")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Enroll many users at once from a CSV manifest and a photo folder
+
+Usage: python -m tools.bulk_enroll manifest.csv photos/ [--workers 4] [--report rejects.csv]
+
+The manifest needs user_id, name, role and photo columns, plus branch for
+students and designation for teachers. photo is relative to the photo folder.
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from database.storage import create_queries
+from utils.encoder import encode_face_with_count, encode_to_bytes
+from utils.profiles import PROFILES
+
+REQUIRED_COLUMNS = ('user_id', 'name', 'role', 'photo')
+
+
+def encode_photo(path, max_size, profile=None):
+    """Encode the face in one photo; return (face_encoding_bytes, reject reason)"""
+    image = cv2.imread(path)
+    if image is None:
+        return None, 'unreadable photo'
+    # ID photos are often far larger than detection needs
+    scale = max_size / max(image.shape[:2])
+    if scale < 1.0:
+        image = cv2.resize(image, (0, 0), fx=scale, fy=scale)
+    face_encoding, face_count = encode_face_with_count(cv2.cvtColor(image, cv2.COLOR_BGR2RGB),
+                                                       profile)
+    if face_count == 0 or face_encoding is None:
+        return None, 'no face'
+    if face_count > 1:
+        return None, 'multiple faces'
+    return encode_to_bytes(face_encoding), None
+
+
+def read_manifest(path, photo_dir):
+    """Return (valid rows, rejects) from the manifest"""
+    rows, rejects, seen = [], [], set()
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Manifest is missing columns: {', '.join(missing)}")
+        for line, row in enumerate(reader, start=2):
+            row = {key: (value or '').strip() for key, value in row.items()}
+            row['line'] = line
+            role = row['role'].lower()
+            reason = None
+            if not row['user_id'] or not row['name']:
+                reason = 'missing user_id or name'
+            elif role not in ('student', 'teacher'):
+                reason = f"invalid role '{row['role']}'"
+            elif role == 'student' and not row.get('branch'):
+                reason = 'missing branch'
+            elif role == 'teacher' and not row.get('designation'):
+                reason = 'missing designation'
+            elif row['user_id'] in seen:
+                reason = 'duplicate user_id'
+            if reason:
+                rejects.append((line, row['user_id'], reason))
+                continue
+            seen.add(row['user_id'])
+            row['role'] = role
+            row['photo'] = os.path.join(photo_dir, row['photo'])
+            rows.append(row)
+    return rows, rejects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('manifest', help='CSV manifest')
+    parser.add_argument('photo_dir', help='folder the photo column is relative to')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=500, help='users per upsert')
+    parser.add_argument('--max-size', type=int, default=1024,
+                        help='downscale photos so their longest side is at most this')
+    parser.add_argument('--profile', choices=list(PROFILES),
+                        help='speed profile (default: FACE_ATTENDANCE_PROFILE or balanced)')
+    parser.add_argument('--report', default='enroll_rejects.csv', help='reject report path')
+    parser.add_argument('--dry-run', action='store_true', help='encode only, do not write')
+    args = parser.parse_args()
+
+    rows, rejects = read_manifest(args.manifest, args.photo_dir)
+    db_queries = create_queries()
+    start = time.perf_counter()
+    pending, enrolled = [], 0
+
+    def flush():
+        nonlocal enrolled
+        if pending and not args.dry_run and not db_queries.upsert_users(pending):
+            raise SystemExit("Failed to write users to the database")
+        enrolled += len(pending)
+        pending.clear()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = pool.map(encode_photo, [row['photo'] for row in rows],
+                           [args.max_size] * len(rows), [args.profile] * len(rows), chunksize=8)
+        for row, (face_encoding, reason) in zip(rows, results):
+            if reason:
+                rejects.append((row['line'], row['user_id'], reason))
+                continue
+            pending.append((row['user_id'], row['name'], row['role'],
+                            row.get('branch') or None, row.get('designation') or None,
+                            face_encoding))
+            if len(pending) >= args.batch_size:
+                flush()
+        flush()
+    elapsed = time.perf_counter() - start
+
+    rejects.sort()
+    with open(args.report, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['line', 'user_id', 'reason'])
+        writer.writerows(rejects)
+
+    photos = len(rows)
+    action = 'Would enroll' if args.dry_run else 'Enrolled'
+    print(f"{action} {enrolled} users, rejected {len(rejects)} (see {args.report})")
+    print(f"Encoded {photos} photos in {elapsed:.1f}s ({photos / max(elapsed, 1e-9):.1f} photos/s "
+          f"with {args.workers} workers)")
+
+
+if __name__ == '__main__':
+    main()
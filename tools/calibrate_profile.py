@@ -0,0 +1,134 @@
+"""Pick the fastest speed profile that still recognizes enough faces on this machine
+
+Usage: python -m tools.calibrate_profile sample.mp4 photos/ [--target-rate 0.9] [--min-fps 5]
+
+Record sample footage at the kiosk with enrolled users walking past, as
+they normally would. Every profile recognizes the same sampled frames; its
+recognition rate is the share of frames in which at least one enrolled
+user was recognized. The recommended profile is the fastest one whose
+rate is at least --target-rate of the best rate any profile reached (so
+empty frames in the footage do not count against any profile), and
+which, with --min-fps, also keeps up that frame rate.
+"""
+import argparse
+import os
+import time
+import cv2
+import dlib
+from core.face_recognition import FaceRecognizer
+from utils.profiles import PROFILES
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def sample_frames(inputs, sample_fps=2.0, max_frames=200):
+    """Read up to max_frames BGR frames, sample_fps per second of video plus every image"""
+    frames = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if len(frames) >= max_frames:
+                    return frames
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    frame = cv2.imread(os.path.join(path, name))
+                    if frame is not None:
+                        frames.append(frame)
+            continue
+        capture = cv2.VideoCapture(path)
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        step = max(1, round(fps / sample_fps))
+        index = 0
+        while len(frames) < max_frames:
+            # grab() skips decoding frames that are not sampled
+            if index % step:
+                if not capture.grab():
+                    break
+            else:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                frames.append(frame)
+            index += 1
+        capture.release()
+    return frames
+
+
+def measure_profile(recognizer, profile, frames, tolerance):
+    """Recognize every frame with profile; return its speed and recognition rate"""
+    recognizer.set_profile(profile)
+    # The first call loads the detector and landmark models
+    recognizer.recognize_faces(frames[0], tolerance)
+    detected = recognized = 0
+    start = time.perf_counter()
+    for frame in frames:
+        results = recognizer.recognize_faces(frame, tolerance)
+        detected += bool(results)
+        recognized += any(result['match'] is not None for result in results)
+    elapsed = time.perf_counter() - start
+    return {
+        'profile': profile,
+        'ms_per_frame': elapsed * 1000.0 / len(frames),
+        'fps': len(frames) / max(elapsed, 1e-9),
+        'detection_rate': detected / len(frames),
+        'recognition_rate': recognized / len(frames),
+    }
+
+
+def choose_profile(rows, target_rate=0.9, min_fps=None):
+    """Return the fastest row meeting both targets, or None"""
+    best_rate = max(row['recognition_rate'] for row in rows)
+    for row in sorted(rows, key=lambda row: row['ms_per_frame']):
+        if row['recognition_rate'] < target_rate * best_rate:
+            continue
+        if min_fps is not None and row['fps'] < min_fps:
+            continue
+        return row
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='video files and/or image directories')
+    parser.add_argument('--target-rate', type=float, default=0.9,
+                        help='required share of the best recognition rate (default 0.9)')
+    parser.add_argument('--min-fps', type=float, help='required recognitions per second')
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES),
+                        help='profiles to try (default: all; cnn only with CUDA)')
+    parser.add_argument('--sample-fps', type=float, default=2.0,
+                        help='frames sampled per second of video')
+    parser.add_argument('--max-frames', type=int, default=200)
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    args = parser.parse_args()
+
+    profiles = args.profiles or [name for name in PROFILES
+                                 if PROFILES[name].model != 'cnn' or dlib.DLIB_USE_CUDA]
+    frames = sample_frames(args.inputs, args.sample_fps, args.max_frames)
+    if not frames:
+        raise SystemExit("No frames could be read from the inputs")
+    recognizer = FaceRecognizer()
+    if len(recognizer.gallery) == 0:
+        raise SystemExit("No enrolled faces; register users before calibrating")
+
+    print(f"Calibrating on {len(frames)} frames against {recognizer.gallery.n_identities} users")
+    print(f"{'profile':<10} {'ms/frame':>9} {'fps':>7} {'detected':>9} {'recognized':>11}")
+    rows = []
+    for profile in profiles:
+        row = measure_profile(recognizer, profile, frames, args.tolerance)
+        rows.append(row)
+        print(f"{profile:<10} {row['ms_per_frame']:>9.1f} {row['fps']:>7.1f} "
+              f"{row['detection_rate']:>9.0%} {row['recognition_rate']:>11.0%}")
+
+    if not any(row['recognition_rate'] for row in rows):
+        raise SystemExit("No enrolled user was recognized in the footage; record sample "
+                         "footage with enrolled users in view")
+    chosen = choose_profile(rows, args.target_rate, args.min_fps)
+    if chosen is None:
+        raise SystemExit("No profile meets the targets on this machine; lower --target-rate "
+                         "or --min-fps, or reduce the number of cameras")
+    print(f"\nFastest profile meeting the targets: {chosen['profile']} "
+          f"({PROFILES[chosen['profile']].describe()})")
+    print(f"Use it with:  export FACE_ATTENDANCE_PROFILE={chosen['profile']}")
+
+
+if __name__ == '__main__':
+    main()
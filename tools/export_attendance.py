@@ -0,0 +1,245 @@
+"""Stream attendance history to CSV or a columnar file in constant memory
+
+Usage: python -m tools.export_attendance attendance-2026.parquet --from 2026-01-01 --to 2026-12-31
+       [--role student] [--branch CSE] [--format csv|parquet|arrow|binary|columnar]
+
+Parquet and Arrow IPC need pyarrow; --format columnar picks Parquet when it is
+installed and the built-in chunked binary format otherwise.
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from database.db_queries import ATTENDANCE_COLUMNS
+from database.storage import create_queries
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+COLUMNS = [column.strip() for column in ATTENDANCE_COLUMNS.split(',')]
+COLUMN_TYPES = {'id': 'int64', 'date': 'date32', 'time': 'time32', 'timestamp': 'timestamp_us'}
+EXTENSION_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow',
+                     '.feather': 'arrow', '.bin': 'binary'}
+
+BINARY_MAGIC = b'FATTCOL1'
+EPOCH_DATE = date(1970, 1, 1)
+EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(value):
+    """MySQL TIME columns arrive as timedelta; accept time objects too"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _encode_value(column_type, value):
+    if column_type == 'date32':
+        return (value - EPOCH_DATE).days
+    if column_type == 'time32':
+        return _seconds(value)
+    if column_type == 'timestamp_us':
+        return (value - EPOCH) // timedelta(microseconds=1)
+    return value
+
+
+class CSVExporter:
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class BinaryExporter:
+    """Chunked columnar binary format for when pyarrow is not installed.
+
+    Layout: magic, a length-prefixed JSON schema, then one block per chunk
+    (uint32 row count, then per column a uint8 validity mask followed by
+    little-endian int32/int64 values, or uint32 offsets and UTF-8 bytes for
+    strings) and a zero row count at the end. read_binary() reads it back.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        schema = json.dumps({'columns': [[column, COLUMN_TYPES.get(column, 'string')]
+                                         for column in COLUMNS]}).encode('utf-8')
+        self._file.write(BINARY_MAGIC + struct.pack('<I', len(schema)) + schema)
+
+    def write(self, rows):
+        self._file.write(struct.pack('<I', len(rows)))
+        for index, column in enumerate(COLUMNS):
+            column_type = COLUMN_TYPES.get(column, 'string')
+            values = [row[index] for row in rows]
+            valid = np.fromiter((value is not None for value in values), dtype=np.uint8,
+                                count=len(values))
+            self._file.write(valid.tobytes())
+            if column_type == 'string':
+                encoded = [value.encode('utf-8') if value is not None else b''
+                           for value in values]
+                offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+                np.cumsum([len(value) for value in encoded], out=offsets[1:])
+                self._file.write(offsets.tobytes())
+                self._file.write(b''.join(encoded))
+            else:
+                dtype = '<i4' if column_type in ('date32', 'time32') else '<i8'
+                array = np.fromiter((_encode_value(column_type, value) if value is not None else 0
+                                     for value in values), dtype=dtype, count=len(values))
+                self._file.write(array.tobytes())
+
+    def close(self):
+        self._file.write(struct.pack('<I', 0))
+        self._file.close()
+
+
+def read_binary(path):
+    """Yield {column: numpy array or list of str} per block of a BinaryExporter file"""
+    with open(path, 'rb') as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not an attendance export")
+        (schema_length,) = struct.unpack('<I', f.read(4))
+        columns = json.loads(f.read(schema_length))['columns']
+        while True:
+            (count,) = struct.unpack('<I', f.read(4))
+            if count == 0:
+                return
+            block = {}
+            for column, column_type in columns:
+                valid = np.frombuffer(f.read(count), dtype=np.uint8).astype(bool)
+                if column_type == 'string':
+                    offsets = np.frombuffer(f.read(4 * (count + 1)), dtype='<u4')
+                    data = f.read(int(offsets[-1]))
+                    block[column] = [data[offsets[i]:offsets[i + 1]].decode('utf-8')
+                                     if valid[i] else None for i in range(count)]
+                else:
+                    dtype = '<i4' if column_type in ('date32', 'time32') else '<i8'
+                    block[column] = np.frombuffer(f.read(np.dtype(dtype).itemsize * count),
+                                                  dtype=dtype)
+            yield block
+
+
+class ArrowExporter:
+    """Parquet (one row group per chunk) or Arrow IPC file via pyarrow"""
+
+    def __init__(self, path, file_format):
+        fields = []
+        for column in COLUMNS:
+            column_type = COLUMN_TYPES.get(column, 'string')
+            fields.append(pyarrow.field(column, {
+                'int64': pyarrow.int64(),
+                'date32': pyarrow.date32(),
+                'time32': pyarrow.time32('s'),
+                'timestamp_us': pyarrow.timestamp('us'),
+                'string': pyarrow.string(),
+            }[column_type]))
+        self.schema = pyarrow.schema(fields)
+        if file_format == 'parquet':
+            self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, rows):
+        arrays = []
+        for index, field in enumerate(self.schema):
+            values = [row[index] for row in rows]
+            if field.type == pyarrow.time32('s'):
+                values = [_seconds(value) if value is not None else None for value in values]
+            arrays.append(pyarrow.array(values, type=field.type))
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def resolve_format(path, requested=None):
+    """Pick the output format from --format or the file extension"""
+    file_format = requested or EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+    if file_format == 'columnar':
+        file_format = 'parquet' if pyarrow is not None else 'binary'
+    if file_format in ('parquet', 'arrow') and pyarrow is None:
+        raise SystemExit(f"{file_format} export needs pyarrow; use --format binary or columnar")
+    return file_format
+
+
+def create_exporter(path, file_format):
+    if file_format == 'csv':
+        return CSVExporter(path)
+    if file_format == 'binary':
+        return BinaryExporter(path)
+    return ArrowExporter(path, file_format)
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process, where the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', help='output file (.csv, .parquet, .arrow or .bin)')
+    parser.add_argument('--format', choices=('csv', 'parquet', 'arrow', 'binary', 'columnar'))
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat)
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat)
+    parser.add_argument('--role', choices=('student', 'teacher'))
+    parser.add_argument('--branch')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='rows fetched per round trip')
+    args = parser.parse_args()
+
+    file_format = resolve_format(args.output, args.format)
+    exporter = create_exporter(args.output, file_format)
+    rows_written = 0
+    start = last_report = time.perf_counter()
+    try:
+        for rows in create_queries().iter_attendance(args.date_from, args.date_to, args.role,
+                                                      args.branch, args.chunk_size):
+            exporter.write(rows)
+            rows_written += len(rows)
+            now = time.perf_counter()
+            if now - last_report >= 5.0:
+                last_report = now
+                print(f"{rows_written} rows ({rows_written / (now - start):.0f} rows/s)",
+                      file=sys.stderr)
+        exporter.close()
+    except BaseException as e:
+        # Whatever stopped the export, never leave a truncated file that
+        # looks like a complete one
+        try:
+            exporter.close()
+        except Exception:
+            pass
+        if os.path.exists(args.output):
+            os.remove(args.output)
+        raise SystemExit(f"Export failed: {str(e) or type(e).__name__}")
+
+    elapsed = time.perf_counter() - start
+    memory = peak_memory_mb()
+    memory = f", peak memory {memory:.0f} MB" if memory is not None else ''
+    print(f"Exported {rows_written} rows to {args.output} ({file_format}) in {elapsed:.1f}s "
+          f"({rows_written / max(elapsed, 1e-9):.0f} rows/s{memory})")
+
+
+if __name__ == '__main__':
+    main()
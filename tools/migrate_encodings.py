@@ -0,0 +1,60 @@
+"""Rewrite pickled face encodings in the raw binary format
+
+Usage: python -m tools.migrate_encodings [--chunk-size 1000] [--dtype float32] [--dry-run]
+"""
+import argparse
+import time
+import numpy as np
+from database.storage import create_queries
+from utils.encoder import bytes_to_encode, encode_to_bytes, is_raw_encoding
+
+
+def migrate(db_queries, chunk_size=1000, dtype=np.float32, dry_run=False):
+    """Convert legacy encodings chunk by chunk and return counters"""
+    stats = {'scanned': 0, 'converted': 0, 'already_raw': 0, 'failed': 0}
+    after_id = 0
+    while True:
+        rows = db_queries.get_encoding_chunk(after_id, chunk_size)
+        if rows is None:
+            raise RuntimeError("Could not read users from the database")
+        if not rows:
+            break
+
+        updates = []
+        for row_id, face_bytes in rows:
+            stats['scanned'] += 1
+            if is_raw_encoding(face_bytes):
+                stats['already_raw'] += 1
+                continue
+            face_encoding = bytes_to_encode(face_bytes)
+            if face_encoding is None:
+                stats['failed'] += 1
+                continue
+            updates.append((encode_to_bytes(face_encoding, dtype), row_id))
+
+        if updates and not dry_run:
+            if not db_queries.update_face_encodings(updates):
+                raise RuntimeError(f"Failed to update chunk after id {after_id}")
+        stats['converted'] += len(updates)
+        after_id = rows[-1][0]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--dtype', choices=['float16', 'float32', 'float64'], default='float32')
+    parser.add_argument('--dry-run', action='store_true', help='decode only, do not write')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = migrate(create_queries(), args.chunk_size, np.dtype(args.dtype), args.dry_run)
+    elapsed = time.perf_counter() - start
+    action = 'Would convert' if args.dry_run else 'Converted'
+    print(f"{action} {stats['converted']} of {stats['scanned']} encodings "
+          f"({stats['already_raw']} already raw, {stats['failed']} undecodable) "
+          f"in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Rebuild the attendance summary tables from the attendance table
+
+Usage: python -m tools.rebuild_summaries [--report 2026-10]
+
+Summaries are kept current by a trigger as attendance is recorded; run this
+once to backfill existing attendance, and after deleting attendance or users.
+"""
+import argparse
+import time
+from datetime import datetime
+from core.attendance import AttendanceTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--report', metavar='YYYY-MM',
+                        type=lambda value: datetime.strptime(value, '%Y-%m').date(),
+                        help='print the monthly percentages for this month afterwards')
+    args = parser.parse_args()
+
+    attendance_tracker = AttendanceTracker()
+    start = time.perf_counter()
+    user_days = attendance_tracker.db_queries.rebuild_attendance_summaries()
+    if user_days is None:
+        raise SystemExit("Failed to rebuild attendance summaries")
+    print(f"Rebuilt summaries: {user_days} user-days in {time.perf_counter() - start:.1f}s")
+
+    if args.report:
+        for row in attendance_tracker.monthly_report(args.report):
+            percentage = 'n/a' if row['percentage'] is None else f"{row['percentage']:.1f}%"
+            print(f"{row['role']:<8} {row['branch'] or '-':<20} {row['user_days']:>7} user-days "
+                  f"{row['enrolled']:>5} enrolled {row['working_days']:>3} days  {percentage}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,97 @@
 """Face encoding utilities"""
 import pickle
+import struct
+import cv2
 import face_recognition
 import numpy as np
+from utils.profiles import get_profile
 
-def encode_face(image):
+# Raw encoding format: a 4-byte header followed by the little-endian vector.
+# Header layout is magic byte, (version << 4 | dtype code), uint16 dimension.
+# The magic byte is not a valid pickle opcode, so legacy pickled BLOBs are
+# told apart by their first byte. The header keeps float32 payloads 4-byte
+# aligned for np.frombuffer.
+ENCODING_MAGIC = 0xFE
+FORMAT_VERSION = 1
+ENCODING_HEADER = struct.Struct('<BBH')
+DTYPE_CODES = {
+    1: np.dtype('<f4'),
+    2: np.dtype('<f8'),
+    3: np.dtype('<f2'),
+}
+CODE_FOR_DTYPE = {dtype: code for code, dtype in DTYPE_CODES.items()}
+
+def encode_face(image, profile=None):
     """Encode a face image into a 128-dimensional vector"""
+    return encode_face_with_count(image, profile)[0]
+
+def encode_face_with_count(image, profile=None):
+    """Encode the first face in an image and return (encoding, number of faces found).
+    
+    profile is a speed profile name or SpeedProfile (see utils.profiles);
+    its enroll settings choose the image scale and jitters.
+    """
     try:
+        profile = get_profile(profile)
         # Convert to RGB if needed
         if len(image.shape) == 3 and image.shape[2] == 4:
             # RGBA to RGB
             image = image[:, :, :3]
+        if profile.enroll_scale != 1.0:
+            image = cv2.resize(image, (0, 0), fx=profile.enroll_scale, fy=profile.enroll_scale)
         
         # Find face locations
-        face_locations = face_recognition.face_locations(image)
+        face_locations = face_recognition.face_locations(
+            image, number_of_times_to_upsample=profile.upsample, model=profile.model)
         
         if len(face_locations) == 0:
-            return None
+            return None, 0
         
         # Get encodings for the face
-        face_encodings = face_recognition.face_encodings(image, face_locations)
+        face_encodings = face_recognition.face_encodings(
+            image, face_locations[:1], num_jitters=profile.enroll_jitters,
+            model=profile.landmarks)
         
         if len(face_encodings) > 0:
-            return face_encodings[0]
+            return face_encodings[0], len(face_locations)
         
-        return None
+        return None, len(face_locations)
     except Exception as e:
         print(f"Error encoding face: {e}")
-        return None
+        return None, 0
 
-def encode_to_bytes(face_encoding):
-    """Convert numpy array to bytes for database storage"""
+def encode_to_bytes(face_encoding, dtype=np.float32):
+    """Convert numpy array to raw bytes for database storage"""
     if face_encoding is None:
         return None
-    return pickle.dumps(face_encoding)
+    dtype = np.dtype(dtype).newbyteorder('<')
+    vector = np.asarray(face_encoding, dtype=dtype).ravel()
+    header = ENCODING_HEADER.pack(
+        ENCODING_MAGIC, (FORMAT_VERSION << 4) | CODE_FOR_DTYPE[dtype], vector.shape[0]
+    )
+    return header + vector.tobytes()
+
+def is_raw_encoding(face_bytes):
+    """Check whether bytes use the raw format rather than a legacy pickle"""
+    return face_bytes is not None and len(face_bytes) >= ENCODING_HEADER.size and \
+        face_bytes[0] == ENCODING_MAGIC
 
 def bytes_to_encode(face_bytes):
-    """Convert bytes from database back to numpy array"""
+    """Convert bytes from database back to numpy array.
+    
+    Raw encodings are returned as a read-only view over face_bytes without
+    copying. Legacy pickled encodings are still accepted.
+    """
     if face_bytes is None:
         return None
     try:
+        if is_raw_encoding(face_bytes):
+            _, version_dtype, dimension = ENCODING_HEADER.unpack_from(face_bytes)
+            version, dtype_code = version_dtype >> 4, version_dtype & 0x0F
+            if version != FORMAT_VERSION or dtype_code not in DTYPE_CODES:
+                raise ValueError(f"unsupported encoding format {version}/{dtype_code}")
+            return np.frombuffer(face_bytes, dtype=DTYPE_CODES[dtype_code],
+                                 count=dimension, offset=ENCODING_HEADER.size)
         return pickle.loads(face_bytes)
     except Exception as e:
         print(f"Error decoding face encoding: {e}")
@@ -0,0 +1,250 @@
+"""Lightweight latency and counter metrics with Prometheus text export"""
+import functools
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = 'face_attendance'
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that goes up and down, such as a current setting"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = float(value)
+
+
+class Histogram:
+    """Latency samples over a rolling window, plus lifetime count and sum"""
+
+    def __init__(self, window=2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Return {quantile: seconds} over the rolling window"""
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles}
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _NullCounter:
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        pass
+
+
+class _NullGauge:
+    __slots__ = ()
+
+    def set(self, value):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+_NULL_COUNTER = _NullCounter()
+_NULL_GAUGE = _NullGauge()
+
+
+class MetricsRegistry:
+    """Named stage timers and counters.
+
+    While disabled, timer(), counter() and gauge() hand out shared no-op objects, so
+    instrumented code pays one attribute check per call and nothing else.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def timer(self, stage):
+        """Context manager recording the duration of a stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage))
+
+    def observe(self, stage, seconds):
+        """Record a stage duration measured elsewhere"""
+        if self.enabled:
+            self.histogram(stage).observe(seconds)
+
+    def counter(self, name):
+        """Return the named counter (a no-op while disabled)"""
+        if not self.enabled:
+            return _NULL_COUNTER
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter())
+        return counter
+
+    def gauge(self, name):
+        """Return the named gauge (a no-op while disabled)"""
+        if not self.enabled:
+            return _NULL_GAUGE
+        gauge = self._gauges.get(name)
+        if gauge is None:
+            with self._lock:
+                gauge = self._gauges.setdefault(name, Gauge())
+        return gauge
+
+    def timed(self, stage):
+        """Decorator recording each call of the function as a stage"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Timer(self.histogram(stage)):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Return current counters, gauges and stage percentiles in milliseconds"""
+        stages = {}
+        for stage, histogram in sorted(self._histograms.items()):
+            stats = {f'p{int(q * 100)}_ms': seconds * 1000.0
+                     for q, seconds in histogram.quantiles().items()}
+            stats['count'] = histogram.count
+            stages[stage] = stats
+        counters = {name: counter.value for name, counter in sorted(self._counters.items())}
+        gauges = {name: gauge.value for name, gauge in sorted(self._gauges.items())}
+        return {'stages': stages, 'counters': counters, 'gauges': gauges}
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        if self._histograms:
+            name = f'{METRIC_PREFIX}_stage_latency_seconds'
+            lines.append(f'# HELP {name} Latency of processing stages over a rolling window')
+            lines.append(f'# TYPE {name} summary')
+            for stage, histogram in sorted(self._histograms.items()):
+                for q, seconds in histogram.quantiles().items():
+                    lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {seconds:.6f}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        for counter_name, counter in sorted(self._counters.items()):
+            name = f'{METRIC_PREFIX}_{counter_name}_total'
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {counter.value}')
+        for gauge_name, gauge in sorted(self._gauges.items()):
+            name = f'{METRIC_PREFIX}_{gauge_name}'
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {gauge.value:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Atomically write the Prometheus text export, e.g. for node_exporter"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port, host='127.0.0.1'):
+        """Serve /metrics on a background thread and return the server"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+        thread.start()
+        return server
+
+
+# Process-wide registry, enabled by FACE_ATTENDANCE_METRICS=1 or a metrics port
+metrics = MetricsRegistry(enabled=os.environ.get('FACE_ATTENDANCE_METRICS') == '1'
+                          or bool(os.environ.get('FACE_ATTENDANCE_METRICS_PORT')))
+
+
+def start_metrics_from_env():
+    """Start the HTTP exporter if FACE_ATTENDANCE_METRICS_PORT is set"""
+    port = os.environ.get('FACE_ATTENDANCE_METRICS_PORT')
+    if not port:
+        return None
+    metrics.enable()
+    return metrics.start_http_server(int(port))
@@ -0,0 +1,51 @@
+"""Named speed/accuracy profiles for face detection and encoding"""
+import os
+
+DEFAULT_PROFILE = 'balanced'
+
+
+class SpeedProfile:
+    """Detection and encoding settings, traded between speed and accuracy.
+
+    frame_scale, model ('hog' or 'cnn'), upsample, landmarks ('small' or
+    'large') and jitters apply to live recognition; enroll_scale and
+    enroll_jitters to the one-off encodings made at registration, where
+    accuracy is worth more time.
+    """
+
+    def __init__(self, name, frame_scale, model='hog', upsample=1, landmarks='small', jitters=1,
+                 enroll_scale=1.0, enroll_jitters=1):
+        self.name = name
+        self.frame_scale = frame_scale
+        self.model = model
+        self.upsample = upsample
+        self.landmarks = landmarks
+        self.jitters = jitters
+        self.enroll_scale = enroll_scale
+        self.enroll_jitters = enroll_jitters
+
+    def describe(self):
+        return (f"scale {self.frame_scale}, {self.model} x{self.upsample} upsample, "
+                f"{self.landmarks} landmarks, {self.jitters} jitter(s); enroll at scale "
+                f"{self.enroll_scale} with {self.enroll_jitters} jitter(s)")
+
+
+# Fastest first. balanced is what recognition always did before profiles.
+# fast skips upsampling, so it misses faces smaller than about 80 pixels at
+# full resolution; cnn needs dlib built with CUDA to be usable live.
+PROFILES = {
+    'fast': SpeedProfile('fast', 0.25, upsample=0, enroll_scale=0.5),
+    'balanced': SpeedProfile('balanced', 0.25),
+    'accurate': SpeedProfile('accurate', 0.5, landmarks='large', enroll_jitters=10),
+    'cnn': SpeedProfile('cnn', 0.5, model='cnn', landmarks='large', enroll_jitters=10),
+}
+
+
+def get_profile(profile=None):
+    """Return a SpeedProfile from a name, a profile, or FACE_ATTENDANCE_PROFILE when None"""
+    if isinstance(profile, SpeedProfile):
+        return profile
+    name = profile or os.environ.get('FACE_ATTENDANCE_PROFILE') or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown speed profile '{name}', expected one of {list(PROFILES)}")
+    return PROFILES[name]